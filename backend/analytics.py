@@ -3,20 +3,294 @@ A/B Testing & Analytics Dashboard
 Compare variants, track metrics, and optimize parameters for better results.
 """
 
+import atexit
+import functools
 import json
 import logging
-from typing import Dict, List, Optional, Any
+import mmap
+import orjson
+import os
+import queue
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Any, BinaryIO
 from pathlib import Path
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import defaultdict, deque
 import statistics
+import numpy as np
+from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Daily metrics log segment file names
+_SEGMENT_RE = re.compile(r'metrics-(\d{8})\.ndjson')
+
+
+def _group_stats(codes: np.ndarray, values: np.ndarray, n_groups: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Compute count/mean/median/std/min/max of values grouped by integer code.
+    Returns one stats dict per code (None for codes with no samples).
+    """
+    counts = np.bincount(codes, minlength=n_groups)
+    if not codes.size:
+        return [None] * n_groups
+    means = np.bincount(codes, weights=values, minlength=n_groups) / np.maximum(counts, 1)
+    
+    # Two-pass sample variance: squared deviations from each group's mean
+    sq_dev = np.bincount(codes, weights=(values - means[codes]) ** 2, minlength=n_groups)
+    std_devs = np.sqrt(sq_dev / np.maximum(counts - 1, 1))
+    
+    # Sort values by group so each group is a contiguous slice
+    order = np.argsort(codes, kind='stable')
+    sorted_values = values[order]
+    present = np.flatnonzero(counts)
+    starts = np.concatenate(([0], np.cumsum(counts)))[present]
+    mins = np.minimum.reduceat(sorted_values, starts)
+    maxs = np.maximum.reduceat(sorted_values, starts)
+    
+    stats: List[Optional[Dict[str, Any]]] = [None] * n_groups
+    for i, code in enumerate(present):
+        count = int(counts[code])
+        start = starts[i]
+        stats[code] = {
+            'count': count,
+            'avg_score': float(means[code]),
+            'median_score': float(np.median(sorted_values[start:start + count])),
+            'std_dev': float(std_devs[code]) if count > 1 else 0,
+            'min_score': float(mins[i]),
+            'max_score': float(maxs[i])
+        }
+    return stats
+
+
+def _with_timestamp(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Add a human-readable ISO timestamp to an entry stored with ts_epoch."""
+    if 'timestamp' in entry or 'ts_epoch' not in entry:
+        return entry
+    return {**entry, 'timestamp': datetime.fromtimestamp(entry['ts_epoch']).isoformat()}
+
+
+class _MetricStore:
+    """
+    Columnar (structure-of-arrays) storage of recorded metrics.
+    Scanned fields live in NumPy arrays grown geometrically on append;
+    metric names, dates and parameter values are stored as integer codes.
+    """
+    
+    INITIAL_CAPACITY = 1024
+    
+    def __init__(self):
+        self.size = 0
+        self._capacity = 0
+        self._arrays: Dict[Any, np.ndarray] = {
+            'value': np.empty(0, dtype=np.float64),
+            'ts_epoch': np.empty(0, dtype=np.float64),
+            'metric_name': np.empty(0, dtype=np.int32),
+            'day': np.empty(0, dtype=np.int32)
+        }
+        self.metric_names: Dict[str, int] = {}
+        self._name_list: List[str] = []
+        self._days: Dict[str, int] = {}
+        self.day_list: List[str] = []
+        # Raw parameter/metadata dicts, only read when building a parameter
+        # column for the first time or exporting history
+        self._parameters: List[Dict[str, Any]] = []
+        self._metadata: List[Dict[str, Any]] = []
+        # Factorized parameter columns: name -> ({value: code}, [values])
+        self._param_values: Dict[str, tuple[Dict[Any, int], List[Any]]] = {}
+    
+    def _reserve(self, extra: int):
+        """Grow every array so that `extra` more rows fit."""
+        needed = self.size + extra
+        if needed <= self._capacity:
+            return
+        capacity = max(needed, self._capacity * 2, self.INITIAL_CAPACITY)
+        for key, array in self._arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self._arrays[key] = grown
+        self._capacity = capacity
+    
+    @staticmethod
+    def _code(index: Dict[Any, int], values: List[Any], value: Any) -> int:
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(values)
+            values.append(value)
+        return code
+    
+    def extend(self, metrics: List[Dict[str, Any]]):
+        """Append metric records."""
+        self._reserve(len(metrics))
+        arrays = self._arrays
+        value, ts_epoch = arrays['value'], arrays['ts_epoch']
+        names, days = arrays['metric_name'], arrays['day']
+        param_columns = [
+            (name, arrays[('param', name)], index, values)
+            for name, (index, values) in self._param_values.items()
+        ]
+        
+        i = self.size
+        for metric in metrics:
+            ts = metric['ts_epoch']
+            parameters = metric['parameters']
+            value[i] = metric['value']
+            ts_epoch[i] = ts
+            names[i] = self._code(self.metric_names, self._name_list, metric['metric_name'])
+            days[i] = self._code(self._days, self.day_list, time.strftime('%Y-%m-%d', time.localtime(ts)))
+            for name, codes, index, values in param_columns:
+                codes[i] = self._code(index, values, parameters[name]) if name in parameters else -1
+            self._parameters.append(parameters)
+            self._metadata.append(metric.get('metadata') or {})
+            i += 1
+        self.size = i
+    
+    def column(self, key: str) -> np.ndarray:
+        """View of the filled part of a column."""
+        return self._arrays[key][:self.size]
+    
+    def param_column(self, parameter_name: str) -> tuple[np.ndarray, np.ndarray, List[Any]]:
+        """
+        Get (building if needed) the factorized column for one parameter.
+        Returns (present_mask, codes, unique_values); codes are -1 where the
+        parameter is missing.
+        """
+        key = ('param', parameter_name)
+        if key not in self._arrays:
+            index: Dict[Any, int] = {}
+            values: List[Any] = []
+            codes = np.full(self._capacity, -1, dtype=np.int32)
+            for i, parameters in enumerate(self._parameters):
+                if parameter_name in parameters:
+                    codes[i] = self._code(index, values, parameters[parameter_name])
+            self._arrays[key] = codes
+            self._param_values[parameter_name] = (index, values)
+        codes = self.column(key)
+        return codes >= 0, codes, self._param_values[parameter_name][1]
+    
+    def records(self) -> List[Dict[str, Any]]:
+        """Rebuild the stored metrics as dicts."""
+        value, ts_epoch = self.column('value'), self.column('ts_epoch')
+        names = self.column('metric_name')
+        return [
+            {
+                'metric_name': self._name_list[names[i]],
+                'value': float(value[i]),
+                'parameters': self._parameters[i],
+                'metadata': self._metadata[i],
+                'ts_epoch': float(ts_epoch[i])
+            }
+            for i in range(self.size)
+        ]
+
+
+def _segment_day(ts_epoch: float) -> str:
+    """Local date (YYYYMMDD) of the metrics log segment a timestamp belongs to."""
+    return time.strftime('%Y%m%d', time.localtime(ts_epoch))
+
+
+class _MetricSegment:
+    """
+    One day of the metrics log (metrics-YYYYMMDD.ndjson). The file is memory
+    mapped and indexed by line offsets on first use; lines are parsed on
+    demand, newest first, so `pending` lines at the start remain unparsed.
+    """
+    
+    def __init__(self, path: Path, day: str):
+        self.path = path
+        self.day = day
+        start = datetime.strptime(day, '%Y%m%d')
+        self.min_ts = start.timestamp()
+        self.max_ts = (start + timedelta(days=1)).timestamp()
+        # Only the bytes present at startup belong to this segment; later
+        # appends by the writer are already held in memory
+        self._size = path.stat().st_size
+        self._mmap: Optional[mmap.mmap] = None
+        self._starts: Optional[np.ndarray] = None
+        self._ends: Optional[np.ndarray] = None
+        self._pending = 0
+    
+    def _index(self):
+        """Memory-map the segment and index line offsets without parsing."""
+        if self._starts is not None:
+            return
+        self._starts = self._ends = np.empty(0, dtype=np.int64)
+        if not self._size:
+            return
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), self._size, access=mmap.ACCESS_READ)
+        
+        buf = np.frombuffer(self._mmap, dtype=np.uint8)
+        newlines = np.flatnonzero(buf == ord('\n'))
+        # A final line without a trailing newline still counts
+        ends = newlines if buf[-1] == ord('\n') else np.append(newlines, len(buf))
+        starts = np.concatenate(([0], newlines + 1))[:len(ends)]
+        non_empty = ends > starts
+        self._starts = starts[non_empty]
+        self._ends = ends[non_empty]
+        self._pending = len(self._starts)
+        del buf
+    
+    @property
+    def pending(self) -> int:
+        """Number of lines not parsed yet."""
+        self._index()
+        return self._pending
+    
+    def _parse_line(self, index: int) -> Optional[Dict[str, Any]]:
+        """Parse one line of the segment."""
+        try:
+            metric = orjson.loads(self._mmap[self._starts[index]:self._ends[index]])
+        except orjson.JSONDecodeError:
+            logger.warning(f"Skipping corrupt line {index} in {self.path.name}")
+            return None
+        if 'ts_epoch' not in metric:
+            metric['ts_epoch'] = datetime.fromisoformat(metric['timestamp']).timestamp()
+        return metric
+    
+    def _line_ts(self, index: int) -> float:
+        """Timestamp of a line (or the next parseable one) for binary search."""
+        for i in range(index, len(self._starts)):
+            metric = self._parse_line(i)
+            if metric is not None:
+                return metric['ts_epoch']
+        return float('inf')
+    
+    def load_since(self, cutoff_epoch: float) -> List[Dict[str, Any]]:
+        """
+        Parse the pending lines at or after cutoff_epoch. Lines are appended
+        in time order, so the first one is found by binary search.
+        """
+        self._index()
+        lo, hi = 0, self._pending
+        if cutoff_epoch > self.min_ts:
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._line_ts(mid) < cutoff_epoch:
+                    lo = mid + 1
+                else:
+                    hi = mid
+        
+        parsed = [self._parse_line(i) for i in range(lo, self._pending)]
+        self._pending = lo
+        if not lo:
+            self.close()
+        return [m for m in parsed if m is not None]
+    
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
 
 class ABTest:
     """Represents an A/B test comparing parameter variants."""
     
+    # Number of most recent results kept in memory per variant
+    RESULT_SAMPLE_SIZE = 500
+    
     def __init__(
         self,
         test_id: str,
@@ -30,50 +304,151 @@ class ABTest:
         self.variant_a = variant_a
         self.variant_b = variant_b
         self.metadata = metadata or {}
-        self.results = {'a': [], 'b': []}
+        # Only recent results are kept; the full history stays in the log
+        self.results = {
+            'a': deque(maxlen=self.RESULT_SAMPLE_SIZE),
+            'b': deque(maxlen=self.RESULT_SAMPLE_SIZE)
+        }
         self.created_at = datetime.now().isoformat()
+        
+        # Running score statistics over all results so the winner doesn't
+        # rescan them: totals plus Welford mean / sum of squared deviations
+        self._sums = {'a': 0.0, 'b': 0.0}
+        self._counts = {'a': 0, 'b': 0}
+        self._means = {'a': 0.0, 'b': 0.0}
+        self._m2 = {'a': 0.0, 'b': 0.0}
+    
+    def _store_result(self, variant: str, result: Dict[str, Any]):
+        """Store a result entry and update running statistics."""
+        self.results[variant].append(result)
+        score = result['score']
+        self._sums[variant] += score
+        self._counts[variant] += 1
+        delta = score - self._means[variant]
+        self._means[variant] += delta / self._counts[variant]
+        self._m2[variant] += delta * (score - self._means[variant])
+    
+    def _variance(self, variant: str) -> float:
+        """Sample variance of a variant's scores."""
+        count = self._counts[variant]
+        return self._m2[variant] / (count - 1) if count > 1 else 0.0
     
-    def add_result(self, variant: str, score: float, feedback: Optional[str] = None):
-        """Add a test result."""
-        self.results[variant].append({
+    def add_result(self, variant: str, score: float, feedback: Optional[str] = None) -> Dict[str, Any]:
+        """Add a test result and return the stored entry."""
+        result = {
             'score': score,
             'feedback': feedback,
-            'timestamp': datetime.now().isoformat()
-        })
+            'ts_epoch': time.time()
+        }
+        self._store_result(variant, result)
+        return result
     
     def get_winner(self) -> Dict[str, Any]:
         """Determine winning variant."""
-        if not self.results['a'] or not self.results['b']:
+        if not self._counts['a'] or not self._counts['b']:
             return {'winner': None, 'reason': 'Insufficient data'}
         
-        avg_a = statistics.mean([r['score'] for r in self.results['a']])
-        avg_b = statistics.mean([r['score'] for r in self.results['b']])
+        avg_a = self._sums['a'] / self._counts['a']
+        avg_b = self._sums['b'] / self._counts['b']
         
         diff = abs(avg_a - avg_b)
         confidence = min(diff / max(avg_a, avg_b) * 100, 100) if max(avg_a, avg_b) > 0 else 0
         
+        # Welch standard error of the difference in means (normal approximation)
+        var_a, var_b = self._variance('a'), self._variance('b')
+        std_err = (var_a / self._counts['a'] + var_b / self._counts['b']) ** 0.5
+        
         return {
             'winner': 'a' if avg_a > avg_b else 'b',
             'avg_score_a': avg_a,
             'avg_score_b': avg_b,
+            'std_dev_a': var_a ** 0.5,
+            'std_dev_b': var_b ** 0.5,
             'difference': diff,
+            'difference_ci_95': [diff - 1.96 * std_err, diff + 1.96 * std_err],
             'confidence': confidence,
-            'sample_size_a': len(self.results['a']),
-            'sample_size_b': len(self.results['b'])
+            'sample_size_a': self._counts['a'],
+            'sample_size_b': self._counts['b']
+        }
+    
+    def to_summary_dict(self, include_winner: bool = False) -> Dict[str, Any]:
+        """Convert to a summary dictionary (result counts, no results)."""
+        summary = {
+            'test_id': self.test_id,
+            'name': self.name,
+            'created_at': self.created_at,
+            'results_count_a': self._counts['a'],
+            'results_count_b': self._counts['b']
+        }
+        if include_winner:
+            summary['winner'] = self.get_winner()
+        return summary
+    
+    def to_full_dict(self, include_winner: bool = False) -> Dict[str, Any]:
+        """Convert to dictionary including the recent results."""
+        data = {
+            'test_id': self.test_id,
+            'name': self.name,
+            'variant_a': self.variant_a,
+            'variant_b': self.variant_b,
+            'metadata': self.metadata,
+            'results': {
+                variant: [_with_timestamp(r) for r in results]
+                for variant, results in self.results.items()
+            },
+            'created_at': self.created_at
         }
+        if include_winner:
+            data['winner'] = self.get_winner()
+        return data
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary."""
+    to_dict = to_full_dict
+    
+    def write_json(self, fp: BinaryIO, include_winner: bool = False):
+        """
+        Write the full test as JSON to a binary writer, encoding results
+        one at a time instead of building the whole tree first.
+        """
+        dumps = orjson.dumps
+        fp.write(dumps(self.to_meta_dict())[:-1])
+        fp.write(b',"results":{')
+        for i, (variant, results) in enumerate(self.results.items()):
+            if i:
+                fp.write(b',')
+            fp.write(dumps(variant) + b':[')
+            fp.write(b','.join(dumps(_with_timestamp(r)) for r in results))
+            fp.write(b']')
+        fp.write(b'}')
+        if include_winner:
+            fp.write(b',"winner":' + dumps(self.get_winner()))
+        fp.write(b'}')
+    
+    def to_meta_dict(self) -> Dict[str, Any]:
+        """Convert test definition (without results) to dictionary."""
         return {
             'test_id': self.test_id,
             'name': self.name,
             'variant_a': self.variant_a,
             'variant_b': self.variant_b,
             'metadata': self.metadata,
-            'results': self.results,
-            'created_at': self.created_at,
-            'winner': self.get_winner()
+            'created_at': self.created_at
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ABTest':
+        """Create from dictionary (meta or full form)."""
+        test = cls(
+            test_id=data['test_id'],
+            name=data['name'],
+            variant_a=data['variant_a'],
+            variant_b=data['variant_b'],
+            metadata=data.get('metadata')
+        )
+        test.created_at = data.get('created_at', test.created_at)
+        for variant, results in data.get('results', {}).items():
+            for result in results:
+                test._store_result(variant, result)
+        return test
 
 
 class AnalyticsManager:
@@ -82,41 +457,274 @@ class AnalyticsManager:
     Tracks quality metrics, parameter performance, and generates insights.
     """
     
-    def __init__(self, storage_path: str = './analytics'):
+    # Maximum number of queued records written (and fsynced) in one batch
+    WRITE_BATCH_SIZE = 128
+    # Seconds the writer waits for more records before writing a batch
+    WRITE_BATCH_WAIT = 0.05
+    # Number of memoized parameter performance analyses
+    PERFORMANCE_CACHE_SIZE = 256
+    # Number of memoized quality trend analyses
+    TRENDS_CACHE_SIZE = 16
+    
+    def __init__(self, storage_path: str = './analytics', retention_days: Optional[int] = None):
+        """
+        Args:
+            storage_path: Directory holding the tests and logs
+            retention_days: Delete metrics log segments older than this
+                many days on startup (None keeps everything)
+        """
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(exist_ok=True)
+        self.retention_days = retention_days
         self.tests: Dict[str, ABTest] = {}
-        self.metrics_history: List[Dict[str, Any]] = []
+        
+        # Metrics history is the unparsed part of the on-disk daily segments
+        # (memory mapped, parsed on demand, oldest first) followed by the
+        # parsed records in _metrics
+        self._metrics = _MetricStore()
+        self._segments: List[_MetricSegment] = []
         self._load_data()
+        
+        # A/B results and metrics are appended one JSON line per record to
+        # their logs by a background writer; callers only enqueue. Metrics go
+        # to the segment of their day, opened (rotated) by the writer
+        self._results_log = open(self.storage_path / 'ab_results.jsonl', 'ab')
+        self._metrics_fp: Optional[BinaryIO] = None
+        self._metrics_day: Optional[str] = None
+        self._write_q: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, name='analytics-writer', daemon=True)
+        self._writer.start()
+        
+        # Parameter performance and trend analyses are memoized per history
+        # version, so any new metric invalidates them
+        self._version = 0
+        self._cached_performance = functools.lru_cache(
+            maxsize=self.PERFORMANCE_CACHE_SIZE
+        )(self._compute_parameter_performance)
+        self._cached_trends = functools.lru_cache(
+            maxsize=self.TRENDS_CACHE_SIZE
+        )(self._compute_quality_trends)
+        atexit.register(self.close)
     
     def _load_data(self):
         """Load stored tests and metrics."""
-        # Load A/B tests
-        tests_file = self.storage_path / 'ab_tests.json'
-        if tests_file.exists():
-            with open(tests_file, 'r') as f:
-                data = json.load(f)
-                for test_data in data:
-                    test = ABTest(**test_data)
+        meta_file = self.storage_path / 'ab_tests_meta.json'
+        results_file = self.storage_path / 'ab_results.jsonl'
+        legacy_file = self.storage_path / 'ab_tests.json'
+        
+        if not meta_file.exists() and legacy_file.exists():
+            self._migrate_legacy_tests(legacy_file, meta_file, results_file)
+        
+        # Load A/B test definitions
+        if meta_file.exists():
+            with open(meta_file, 'rb') as f:
+                for test_data in orjson.loads(f.read()):
+                    test = ABTest.from_dict(test_data)
                     self.tests[test.test_id] = test
         
+        # Replay A/B results log
+        if results_file.exists():
+            with open(results_file, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        logger.warning(f"Skipping corrupt line in {results_file.name}")
+                        continue
+                    test = self.tests.get(record.pop('test_id', None))
+                    if test:
+                        test._store_result(record.pop('variant'), record)
+        
         # Load metrics history
-        metrics_file = self.storage_path / 'metrics_history.json'
+        metrics_file = self.storage_path / 'metrics.ndjson'
+        legacy_metrics_file = self.storage_path / 'metrics_history.json'
         if metrics_file.exists():
-            with open(metrics_file, 'r') as f:
-                self.metrics_history = json.load(f)
+            self._migrate_metrics_log(metrics_file)
+        elif legacy_metrics_file.exists() and not self._segment_paths():
+            self._migrate_legacy_metrics(legacy_metrics_file)
+        
+        self._open_segments()
+    
+    def _segment_paths(self) -> Dict[str, Path]:
+        """Metrics log segments on disk by day."""
+        with os.scandir(self.storage_path) as it:
+            return {
+                m.group(1): Path(e.path)
+                for e in it
+                if (m := _SEGMENT_RE.fullmatch(e.name))
+            }
+    
+    def _open_segments(self):
+        """Index the metrics log segments, dropping those past retention."""
+        oldest_kept = None
+        if self.retention_days is not None:
+            oldest_kept = _segment_day(time.time() - self.retention_days * 86400)
+        
+        for day, path in sorted(self._segment_paths().items()):
+            if oldest_kept is not None and day < oldest_kept:
+                path.unlink()
+                logger.info(f"Deleted expired metrics segment {path.name}")
+                continue
+            self._segments.append(_MetricSegment(path, day))
+    
+    def _write_segments(self, metrics: List[Dict[str, Any]]):
+        """Write metrics into their daily segments (replacing those files)."""
+        by_day: Dict[str, List[bytes]] = defaultdict(list)
+        for metric in metrics:
+            if 'ts_epoch' not in metric:
+                metric['ts_epoch'] = datetime.fromisoformat(metric['timestamp']).timestamp()
+            by_day[_segment_day(metric['ts_epoch'])].append(orjson.dumps(metric) + b'\n')
+        for day, lines in by_day.items():
+            with open(self.storage_path / f'metrics-{day}.ndjson', 'wb') as f:
+                f.write(b''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def _load_metrics_since(self, cutoff_epoch: float):
+        """
+        Make sure every on-disk metric at or after cutoff_epoch is parsed.
+        Only segments whose day ends after the cutoff are opened, newest
+        first; within the oldest one the cutoff is found by binary search.
+        """
+        parsed: List[Dict[str, Any]] = []
+        while self._segments and self._segments[-1].max_ts > cutoff_epoch:
+            segment = self._segments[-1]
+            parsed[:0] = segment.load_since(cutoff_epoch)
+            if segment.pending:
+                break
+            self._segments.pop()
+        
+        if parsed:
+            # Older metrics go in front; rare, so the store is simply rebuilt
+            metrics = _MetricStore()
+            metrics.extend(parsed)
+            metrics.extend(self._metrics.records())
+            self._metrics = metrics
+    
+    @property
+    def metrics_history(self) -> List[Dict[str, Any]]:
+        """All recorded metrics, parsing any history not yet loaded from disk."""
+        self._load_metrics_since(float('-inf'))
+        return self._metrics.records()
+    
+    @property
+    def metrics_count(self) -> int:
+        """Number of recorded metrics, without parsing the on-disk log."""
+        return sum(segment.pending for segment in self._segments) + self._metrics.size
+    
+    def _migrate_legacy_tests(self, legacy_file: Path, meta_file: Path, results_file: Path):
+        """Split a legacy ab_tests.json into the meta file and results log."""
+        with open(legacy_file, 'r') as f:
+            data = json.load(f)
+        
+        with open(results_file, 'ab') as f:
+            for test_data in data:
+                for variant, results in test_data.get('results', {}).items():
+                    for result in results:
+                        f.write(orjson.dumps({'test_id': test_data['test_id'], 'variant': variant, **result}) + b'\n')
+        
+        with open(meta_file, 'wb') as f:
+            f.write(orjson.dumps([ABTest.from_dict(d).to_meta_dict() for d in data]))
+        
+        logger.info(f"Migrated {len(data)} A/B tests from {legacy_file.name}")
+    
+    def _migrate_metrics_log(self, metrics_file: Path):
+        """Split a single metrics.ndjson log into daily segments."""
+        metrics = []
+        with open(metrics_file, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    metrics.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt line in {metrics_file.name}")
+        self._write_segments(metrics)
+        metrics_file.unlink()
+        logger.info(f"Split {len(metrics)} metrics from {metrics_file.name} into daily segments")
+    
+    def _migrate_legacy_metrics(self, legacy_file: Path):
+        """Convert a legacy metrics_history.json into daily metrics segments."""
+        with open(legacy_file, 'r') as f:
+            data = json.load(f)
+        
+        self._write_segments(data)
+        # Moved aside, not left in place: once retention has deleted every
+        # segment it would otherwise be migrated again on the next start
+        legacy_file.replace(legacy_file.with_name(legacy_file.name + '.migrated'))
+        logger.info(f"Migrated {len(data)} metrics from {legacy_file.name}")
     
     def _save_tests(self):
-        """Save A/B tests to disk."""
-        tests_file = self.storage_path / 'ab_tests.json'
-        with open(tests_file, 'w') as f:
-            json.dump([t.to_dict() for t in self.tests.values()], f, indent=2)
+        """Save A/B test definitions to disk."""
+        meta_file = self.storage_path / 'ab_tests_meta.json'
+        with open(meta_file, 'wb') as f:
+            f.write(orjson.dumps([t.to_meta_dict() for t in self.tests.values()]))
+    
+    def _writer_loop(self):
+        """Drain the write queue in batches: one write and fsync per log per batch."""
+        while True:
+            item = self._write_q.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.WRITE_BATCH_WAIT
+            stop = False
+            while len(batch) < self.WRITE_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._write_q.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+            if stop:
+                return
+    
+    def _write_batch(self, batch: List[tuple]):
+        """
+        Write a batch of (log, record) pairs, grouped by target file: the
+        results log, or the metrics segment of each record's day.
+        """
+        lines: Dict[Optional[str], List[bytes]] = defaultdict(list)
+        for log, record in batch:
+            key = _segment_day(record['ts_epoch']) if log == 'metrics' else None
+            lines[key].append(orjson.dumps(record) + b'\n')
+        for day, chunks in lines.items():
+            try:
+                fp = self._results_log if day is None else self._metrics_segment(day)
+                fp.write(b''.join(chunks))
+                fp.flush()
+                os.fsync(fp.fileno())
+            except Exception as e:
+                logger.error(f"Failed to write {len(chunks)} records to {day or 'results'} log: {str(e)}")
+    
+    def _metrics_segment(self, day: str) -> BinaryIO:
+        """Metrics segment file for a day, closing the previous day's file."""
+        if day != self._metrics_day:
+            if self._metrics_fp is not None:
+                self._metrics_fp.close()
+            self._metrics_fp = open(self.storage_path / f'metrics-{day}.ndjson', 'ab')
+            self._metrics_day = day
+        return self._metrics_fp
     
-    def _save_metrics(self):
-        """Save metrics history to disk."""
-        metrics_file = self.storage_path / 'metrics_history.json'
-        with open(metrics_file, 'w') as f:
-            json.dump(self.metrics_history, f, indent=2)
+    def close(self):
+        """Drain pending writes to disk and close the logs."""
+        if self._writer.is_alive():
+            self._write_q.put(None)
+            self._writer.join()
+        if not self._results_log.closed:
+            self._results_log.close()
+        if self._metrics_fp is not None and not self._metrics_fp.closed:
+            self._metrics_fp.close()
+        for segment in self._segments:
+            segment.close()
     
     def create_test(
         self,
@@ -145,26 +753,16 @@ class AnalyticsManager:
         if not test:
             raise ValueError(f"Test not found: {test_id}")
         
-        test.add_result(variant, score, feedback)
-        self._save_tests()
+        result = test.add_result(variant, score, feedback)
+        self._write_q.put(('results', {'test_id': test_id, 'variant': variant, **result}))
     
     def get_test(self, test_id: str) -> Optional[ABTest]:
         """Get an A/B test."""
         return self.tests.get(test_id)
     
-    def list_tests(self) -> List[Dict[str, Any]]:
+    def list_tests(self, include_winner: bool = False) -> List[Dict[str, Any]]:
         """List all A/B tests with summaries."""
-        return [
-            {
-                'test_id': t.test_id,
-                'name': t.name,
-                'created_at': t.created_at,
-                'results_count_a': len(t.results['a']),
-                'results_count_b': len(t.results['b']),
-                'winner': t.get_winner()
-            }
-            for t in self.tests.values()
-        ]
+        return [t.to_summary_dict(include_winner) for t in self.tests.values()]
     
     def record_metric(
         self,
@@ -179,10 +777,11 @@ class AnalyticsManager:
             'value': value,
             'parameters': parameters,
             'metadata': metadata or {},
-            'timestamp': datetime.now().isoformat()
+            'ts_epoch': time.time()
         }
-        self.metrics_history.append(metric)
-        self._save_metrics()
+        self._metrics.extend([metric])
+        self._version += 1
+        self._write_q.put(('metrics', metric))
     
     def get_parameter_performance(
         self,
@@ -201,33 +800,42 @@ class AnalyticsManager:
         Returns:
             Performance analysis for each parameter value
         """
-        cutoff_date = datetime.now() - timedelta(days=days)
+        cutoff_epoch = (datetime.now() - timedelta(days=days)).timestamp()
+        # Cutoff is truncated to the minute so repeated calls share a cache entry
+        cutoff_minute = int(cutoff_epoch // 60)
+        return self._cached_performance(
+            parameter_name, metric_name, days, cutoff_minute, self._version
+        )
+    
+    def _compute_parameter_performance(
+        self,
+        parameter_name: str,
+        metric_name: str,
+        days: int,
+        cutoff_minute: int,
+        version: int
+    ) -> Dict[str, Any]:
+        """Uncached body of get_parameter_performance."""
+        cutoff_epoch = cutoff_minute * 60.0
+        self._load_metrics_since(cutoff_epoch)
+        
+        metrics = self._metrics
+        present, param_codes, param_values = metrics.param_column(parameter_name)
         
         # Filter recent metrics
-        recent_metrics = [
-            m for m in self.metrics_history
-            if datetime.fromisoformat(m['timestamp']) >= cutoff_date
-            and m['metric_name'] == metric_name
-            and parameter_name in m['parameters']
-        ]
+        mask = (
+            (metrics.column('ts_epoch') >= cutoff_epoch)
+            & (metrics.column('metric_name') == metrics.metric_names.get(metric_name, -1))
+            & present
+        )
         
-        # Group by parameter value
-        performance = defaultdict(list)
-        for metric in recent_metrics:
-            param_value = metric['parameters'][parameter_name]
-            performance[param_value].append(metric['value'])
-        
-        # Calculate statistics
-        analysis = {}
-        for value, scores in performance.items():
-            analysis[value] = {
-                'count': len(scores),
-                'avg_score': statistics.mean(scores),
-                'median_score': statistics.median(scores),
-                'std_dev': statistics.stdev(scores) if len(scores) > 1 else 0,
-                'min_score': min(scores),
-                'max_score': max(scores)
-            }
+        # Group by parameter value and calculate statistics
+        group_stats = _group_stats(param_codes[mask], metrics.column('value')[mask], len(param_values))
+        analysis = {
+            value: stats
+            for value, stats in zip(param_values, group_stats)
+            if stats is not None
+        }
         
         # Rank by average score
         ranked = sorted(
@@ -240,8 +848,8 @@ class AnalyticsManager:
             'parameter': parameter_name,
             'metric': metric_name,
             'days_analyzed': days,
-            'total_samples': len(recent_metrics),
-            'performance': dict(analysis),
+            'total_samples': int(mask.sum()),
+            'performance': analysis,
             'ranking': [{'value': v, **stats} for v, stats in ranked]
         }
     
@@ -309,46 +917,62 @@ class AnalyticsManager:
         Returns:
             Trend analysis with daily averages
         """
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        recent_metrics = [
-            m for m in self.metrics_history
-            if datetime.fromisoformat(m['timestamp']) >= cutoff_date
-        ]
+        cutoff_epoch = (datetime.now() - timedelta(days=days)).timestamp()
+        # Cutoff is truncated to the minute so repeated calls share a cache entry
+        cutoff_minute = int(cutoff_epoch // 60)
+        return self._cached_trends(days, cutoff_minute, self._version)
+    
+    def _compute_quality_trends(self, days: int, cutoff_minute: int, version: int) -> Dict[str, Any]:
+        """Uncached body of get_quality_trends."""
+        cutoff_epoch = cutoff_minute * 60.0
+        self._load_metrics_since(cutoff_epoch)
         
-        # Group by date
-        daily_scores = defaultdict(list)
-        for metric in recent_metrics:
-            date = datetime.fromisoformat(metric['timestamp']).date().isoformat()
-            daily_scores[date].append(metric['value'])
+        metrics = self._metrics
+        mask = metrics.column('ts_epoch') >= cutoff_epoch
+        recent_values = metrics.column('value')[mask]
         
-        # Calculate daily averages
-        trends = []
-        for date, scores in sorted(daily_scores.items()):
-            trends.append({
+        # Group by (local) date and calculate daily averages
+        day_stats = _group_stats(metrics.column('day')[mask], recent_values, len(metrics.day_list))
+        trends = [
+            {
                 'date': date,
-                'avg_score': statistics.mean(scores),
-                'count': len(scores),
-                'min_score': min(scores),
-                'max_score': max(scores)
-            })
+                'avg_score': stats['avg_score'],
+                'count': stats['count'],
+                'min_score': stats['min_score'],
+                'max_score': stats['max_score']
+            }
+            for date, stats in sorted(zip(metrics.day_list, day_stats))
+            if stats is not None
+        ]
         
         # Calculate overall trend
         if len(trends) >= 2:
-            first_week_avg = statistics.mean([t['avg_score'] for t in trends[:7]])
-            last_week_avg = statistics.mean([t['avg_score'] for t in trends[-7:]])
+            first_week_avg = statistics.fmean(t['avg_score'] for t in trends[:7])
+            last_week_avg = statistics.fmean(t['avg_score'] for t in trends[-7:])
             trend_direction = 'improving' if last_week_avg > first_week_avg else 'declining'
         else:
             trend_direction = 'insufficient_data'
         
         return {
             'days_analyzed': days,
-            'total_generations': len(recent_metrics),
+            'total_generations': int(recent_values.size),
             'daily_trends': trends,
             'trend_direction': trend_direction,
-            'overall_avg': statistics.mean([m['value'] for m in recent_metrics]) if recent_metrics else 0
+            'overall_avg': float(recent_values.mean()) if recent_values.size else 0
         }
 
 
-# Global instance
-analytics_manager = AnalyticsManager()
+# Global instance, created on first access so importing this module
+# doesn't load stored data
+_analytics_manager: Optional[AnalyticsManager] = None
+
+
+def __getattr__(name: str):
+    global _analytics_manager
+    if name == 'analytics_manager':
+        if _analytics_manager is None:
+            _analytics_manager = AnalyticsManager(
+                retention_days=settings.ANALYTICS_RETENTION_DAYS or None
+            )
+        return _analytics_manager
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
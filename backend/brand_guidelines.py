@@ -3,14 +3,103 @@ Brand Guidelines System - Store and enforce brand identity across generations.
 Validates colors, styles, and visual consistency for professional tools.
 """
 
-import json
+import atexit
 import logging
-from typing import Dict, List, Optional, Any
+import orjson
+import os
+import struct
+from typing import Dict, List, Optional, Any, Set
 from pathlib import Path
 import re
 
 logger = logging.getLogger(__name__)
 
+# Length prefix of each guidelines.wal record
+_WAL_HEADER = struct.Struct('<I')
+
+# Document parsing tables, compiled once at import
+_COLOR_RE = re.compile(r'#[0-9A-Fa-f]{6}')
+
+_FONTS_LOWER = tuple(
+    (font, font.lower())
+    for font in ('Arial', 'Helvetica', 'Roboto', 'Open Sans', 'Montserrat',
+                 'Lato', 'Georgia', 'Times New Roman', 'Verdana')
+)
+
+_STYLE_KEYWORDS = (
+    ('minimalist', ('minimal', 'simple', 'clean', 'modern')),
+    ('vintage', ('vintage', 'retro', 'classic', 'nostalgic')),
+    ('cinematic', ('cinematic', 'dramatic', 'film', 'movie')),
+    ('realistic', ('realistic', 'photographic', 'natural'))
+)
+
+# One alternation over every style keyword, each style a named group; the
+# lookahead makes matches zero-width so overlapping keywords are all seen
+_STYLE_RE = re.compile('(?=' + '|'.join(
+    f"(?P<{style}>{'|'.join(map(re.escape, keywords))})"
+    for style, keywords in _STYLE_KEYWORDS
+) + ')')
+
+
+def _write_atomic(path: Path, payload: bytes):
+    """Write a file via a temp file and rename so a crash never leaves it partial."""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _is_member(value: Any, options: frozenset) -> bool:
+    """Set membership that treats unhashable values (lists, dicts) as absent."""
+    try:
+        return value in options
+    except TypeError:
+        return False
+
+
+def _check_style(g: 'BrandGuideline', params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    requested = params.get('style')
+    if g._styles_set and requested and not _is_member(requested, g._styles_set):
+        return {'field': 'style', 'requested': requested, 'allowed': g.styles, 'severity': 'high'}
+    return None
+
+
+def _check_color_palette(g: 'BrandGuideline', params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    requested = params.get('color_palette')
+    if g._allowed_palettes_set and not _is_member(requested, g._allowed_palettes_set):
+        return {'field': 'color_palette', 'requested': requested, 'allowed': g._allowed_palettes, 'severity': 'medium'}
+    return None
+
+
+def _check_lighting(g: 'BrandGuideline', params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    requested = params.get('lighting')
+    if _is_member(requested, g._forbidden_lighting_set):
+        return {
+            'field': 'lighting',
+            'requested': requested,
+            'reason': 'Lighting style forbidden by brand guidelines',
+            'severity': 'high'
+        }
+    return None
+
+
+def _check_composition(g: 'BrandGuideline', params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    required = g._required_composition
+    if required and params.get('composition') != required:
+        return {'field': 'composition', 'message': f'Brand prefers {required} composition', 'severity': 'low'}
+    return None
+
+
+# Validation rules as (check, score penalty, is_violation); non-violations are warnings
+_RULES = (
+    (_check_style, 20, True),
+    (_check_color_palette, 15, True),
+    (_check_lighting, 20, True),
+    (_check_composition, 5, False)
+)
+
 
 class BrandGuideline:
     """Represents a brand guideline profile."""
@@ -32,6 +121,17 @@ class BrandGuideline:
         self.styles = styles or []
         self.rules = rules or {}
         self.metadata = metadata or {}
+        self.compile_rules()
+    
+    def compile_rules(self):
+        """Precompute the lookup sets used by validation; call after edits."""
+        lighting_rules = self.rules.get('lighting', {})
+        composition_rules = self.rules.get('composition', {})
+        self._styles_set = frozenset(self.styles)
+        self._allowed_palettes = self.rules.get('allowed_color_palettes', []) if self.colors else []
+        self._allowed_palettes_set = frozenset(self._allowed_palettes)
+        self._forbidden_lighting_set = frozenset(lighting_rules.get('forbidden', [])) if lighting_rules else frozenset()
+        self._required_composition = composition_rules.get('required') if composition_rules else None
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary."""
@@ -57,23 +157,134 @@ class BrandGuidelineManager:
     Stores brand profiles per project for consistent visual identity.
     """
     
+    # Number of WAL records written before they are compacted into snapshots
+    WAL_COMPACT_THRESHOLD = 256
+    
     def __init__(self, storage_path: str = './brand_guidelines'):
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(exist_ok=True)
         self.guidelines: Dict[str, BrandGuideline] = {}
+        
+        # Mutations are appended to a write-ahead log and periodically
+        # compacted into the per-brand <brand_id>.json snapshots
+        self._wal_path = self.storage_path / 'guidelines.wal'
+        # All snapshots consolidated into one file for a single-read cold start
+        self._bundle_path = self.storage_path / 'guidelines.bundle'
+        self._wal = open(self._wal_path, 'ab')
+        self._wal_records = 0
+        self._dirty: Set[str] = set()
+        
         self._load_all()
+        atexit.register(self.close)
     
     def _load_all(self):
-        """Load all stored guidelines."""
-        for file in self.storage_path.glob('*.json'):
-            try:
-                with open(file, 'r') as f:
-                    data = json.load(f)
+        """Load all stored guidelines, then replay the WAL on top."""
+        with os.scandir(self.storage_path) as it:
+            snapshots = [e for e in it if e.name.endswith('.json') and e.is_file()]
+        
+        bundle = self._read_bundle(snapshots)
+        if bundle is not None:
+            for data in bundle:
+                guideline = BrandGuideline.from_dict(data)
+                self.guidelines[guideline.brand_id] = guideline
+            logger.info(f"Loaded {len(bundle)} brand guidelines from {self._bundle_path.name}")
+        else:
+            for entry in snapshots:
+                try:
+                    data = orjson.loads(Path(entry.path).read_bytes())
                     guideline = BrandGuideline.from_dict(data)
                     self.guidelines[guideline.brand_id] = guideline
-                logger.info(f"Loaded brand guideline: {guideline.name}")
-            except Exception as e:
-                logger.error(f"Failed to load {file}: {str(e)}")
+                    logger.info(f"Loaded brand guideline: {guideline.name}")
+                except Exception as e:
+                    logger.error(f"Failed to load {entry.name}: {str(e)}")
+            if self.guidelines:
+                self._write_bundle()
+        
+        self._replay_wal()
+        if self._dirty:
+            self.compact()
+    
+    def _read_bundle(self, snapshots: List[os.DirEntry]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Read the consolidated bundle, or None if it is missing, unreadable
+        or older than the per-brand snapshots.
+        """
+        try:
+            bundle_mtime = self._bundle_path.stat().st_mtime_ns
+            if any(e.stat().st_mtime_ns > bundle_mtime for e in snapshots):
+                return None
+            bundle = orjson.loads(self._bundle_path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Failed to load {self._bundle_path.name}: {str(e)}")
+            return None
+        if len(bundle) != len(snapshots):
+            return None
+        return bundle
+    
+    def _replay_wal(self):
+        """Apply mutations recorded in the WAL since the last compaction."""
+        data = self._wal_path.read_bytes()
+        offset = 0
+        while offset + _WAL_HEADER.size <= len(data):
+            (length,) = _WAL_HEADER.unpack_from(data, offset)
+            start = offset + _WAL_HEADER.size
+            if start + length > len(data):
+                logger.warning(f"Ignoring truncated record at end of {self._wal_path.name}")
+                break
+            record = orjson.loads(data[start:start + length])
+            offset = start + length
+            
+            brand_id = record['brand_id']
+            if record['op'] == 'upsert':
+                self.guidelines[brand_id] = BrandGuideline.from_dict(record['data'])
+            elif record['op'] == 'delete':
+                self.guidelines.pop(brand_id, None)
+            self._dirty.add(brand_id)
+    
+    def _log_mutation(self, op: str, brand_id: str, data: Optional[Dict[str, Any]] = None):
+        """Append a mutation record to the WAL."""
+        payload = orjson.dumps({'op': op, 'brand_id': brand_id, 'data': data})
+        self._wal.write(_WAL_HEADER.pack(len(payload)) + payload)
+        self._wal.flush()
+        self._dirty.add(brand_id)
+        self._wal_records += 1
+        if self._wal_records >= self.WAL_COMPACT_THRESHOLD:
+            self.compact()
+    
+    def compact(self):
+        """Write the latest state of changed brands to their snapshots and reset the WAL."""
+        for brand_id in self._dirty:
+            file_path = self.storage_path / f"{brand_id}.json"
+            guideline = self.guidelines.get(brand_id)
+            if guideline is None:
+                if file_path.exists():
+                    file_path.unlink()
+                continue
+            
+            _write_atomic(file_path, orjson.dumps(guideline.to_dict()))
+        
+        if self._dirty:
+            self._write_bundle()
+        self._dirty.clear()
+        self._wal.flush()
+        self._wal.truncate(0)
+        self._wal_records = 0
+    
+    def _write_bundle(self):
+        """Write all guidelines to the consolidated bundle."""
+        _write_atomic(
+            self._bundle_path,
+            orjson.dumps([g.to_dict() for g in self.guidelines.values()])
+        )
+    
+    def close(self):
+        """Compact pending mutations and close the WAL."""
+        if not self._wal.closed:
+            if self._dirty:
+                self.compact()
+            self._wal.close()
     
     def create_guideline(
         self,
@@ -103,10 +314,8 @@ class BrandGuidelineManager:
         return guideline
     
     def _save_guideline(self, guideline: BrandGuideline):
-        """Save guideline to disk."""
-        file_path = self.storage_path / f"{guideline.brand_id}.json"
-        with open(file_path, 'w') as f:
-            json.dump(guideline.to_dict(), f, indent=2)
+        """Record guideline state in the WAL."""
+        self._log_mutation('upsert', guideline.brand_id, guideline.to_dict())
     
     def get_guideline(self, brand_id: str) -> Optional[BrandGuideline]:
         """Retrieve a brand guideline."""
@@ -139,6 +348,7 @@ class BrandGuidelineManager:
         for key, value in updates.items():
             if hasattr(guideline, key) and value is not None:
                 setattr(guideline, key, value)
+        guideline.compile_rules()
         
         self._save_guideline(guideline)
         logger.info(f"Updated brand guideline: {brand_id}")
@@ -149,13 +359,9 @@ class BrandGuidelineManager:
         if brand_id not in self.guidelines:
             return False
         
-        # Delete file
-        file_path = self.storage_path / f"{brand_id}.json"
-        if file_path.exists():
-            file_path.unlink()
-        
-        # Remove from memory
+        # Remove from memory; the snapshot file is removed on compaction
         del self.guidelines[brand_id]
+        self._log_mutation('delete', brand_id)
         logger.info(f"Deleted brand guideline: {brand_id}")
         return True
     
@@ -182,58 +388,11 @@ class BrandGuidelineManager:
         warnings = []
         score = 100
         
-        # Check style compliance
-        if guideline.styles:
-            requested_style = parameters.get('style')
-            if requested_style and requested_style not in guideline.styles:
-                violations.append({
-                    'field': 'style',
-                    'requested': requested_style,
-                    'allowed': guideline.styles,
-                    'severity': 'high'
-                })
-                score -= 20
-        
-        # Check color palette compliance
-        if guideline.colors:
-            requested_palette = parameters.get('color_palette')
-            # If brand specifies allowed palettes in rules
-            allowed_palettes = guideline.rules.get('allowed_color_palettes', [])
-            if allowed_palettes and requested_palette not in allowed_palettes:
-                violations.append({
-                    'field': 'color_palette',
-                    'requested': requested_palette,
-                    'allowed': allowed_palettes,
-                    'severity': 'medium'
-                })
-                score -= 15
-        
-        # Check lighting rules
-        lighting_rules = guideline.rules.get('lighting', {})
-        if lighting_rules:
-            requested_lighting = parameters.get('lighting')
-            forbidden_lighting = lighting_rules.get('forbidden', [])
-            if requested_lighting in forbidden_lighting:
-                violations.append({
-                    'field': 'lighting',
-                    'requested': requested_lighting,
-                    'reason': 'Lighting style forbidden by brand guidelines',
-                    'severity': 'high'
-                })
-                score -= 20
-        
-        # Check composition rules
-        composition_rules = guideline.rules.get('composition', {})
-        if composition_rules:
-            requested_composition = parameters.get('composition')
-            required_composition = composition_rules.get('required')
-            if required_composition and requested_composition != required_composition:
-                warnings.append({
-                    'field': 'composition',
-                    'message': f'Brand prefers {required_composition} composition',
-                    'severity': 'low'
-                })
-                score -= 5
+        for check, penalty, is_violation in _RULES:
+            issue = check(guideline, parameters)
+            if issue is not None:
+                (violations if is_violation else warnings).append(issue)
+                score -= penalty
         
         # Overall compliance determination
         compliance_level = 'excellent' if score >= 90 else \
@@ -299,30 +458,30 @@ class BrandGuidelineManager:
         }
         
         # Extract hex colors
-        color_pattern = r'#[0-9A-Fa-f]{6}'
-        parsed['colors'] = list(set(re.findall(color_pattern, document_text)))
+        parsed['colors'] = list(set(_COLOR_RE.findall(document_text)))
         
-        # Extract common font names (simple approach)
-        common_fonts = ['Arial', 'Helvetica', 'Roboto', 'Open Sans', 'Montserrat', 
-                        'Lato', 'Georgia', 'Times New Roman', 'Verdana']
-        for font in common_fonts:
-            if font.lower() in document_text.lower():
-                parsed['fonts'].append(font)
+        # Lowercase once for all keyword scans
+        doc_low = document_text.lower()
         
-        # Extract style keywords
-        style_keywords = {
-            'minimalist': ['minimal', 'simple', 'clean', 'modern'],
-            'vintage': ['vintage', 'retro', 'classic', 'nostalgic'],
-            'cinematic': ['cinematic', 'dramatic', 'film', 'movie'],
-            'realistic': ['realistic', 'photographic', 'natural']
-        }
+        # Extract common font names (simple approach)
+        parsed['fonts'] = [font for font, font_low in _FONTS_LOWER if font_low in doc_low]
         
-        for style, keywords in style_keywords.items():
-            if any(kw in document_text.lower() for kw in keywords):
-                parsed['styles'].append(style)
+        # Extract style keywords in a single regex pass
+        found_styles = {m.lastgroup for m in _STYLE_RE.finditer(doc_low)}
+        parsed['styles'] = [style for style, _ in _STYLE_KEYWORDS if style in found_styles]
         
         return parsed
 
 
-# Global instance
-brand_manager = BrandGuidelineManager()
+# Global instance, created on first access so importing this module
+# doesn't load stored data
+_brand_manager: Optional[BrandGuidelineManager] = None
+
+
+def __getattr__(name: str):
+    global _brand_manager
+    if name == 'brand_manager':
+        if _brand_manager is None:
+            _brand_manager = BrandGuidelineManager()
+        return _brand_manager
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -5,13 +5,67 @@ Edge detection, pose estimation, depth maps for precise image generation.
 
 import cv2
 import numpy as np
-from PIL import Image
-import io
 import logging
-from typing import Literal, Optional, Dict, Any, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Literal, Optional, Dict, Any, Mapping, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Canny thresholds of the multi-scale HED approximation, run in parallel
+_HED_THRESHOLDS = ((50, 150), (100, 200), (150, 250))
+
+# Threads for independent OpenCV passes within one request (OpenCV
+# releases the GIL while it runs)
+_CV_POOL = ThreadPoolExecutor(max_workers=len(_HED_THRESHOLDS), thread_name_prefix='controlnet')
+
+# Descriptions of the control types, shared read-only by every caller
+_CONTROL_INFO: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    'canny_edge': MappingProxyType({
+        'name': 'Canny Edge Detection',
+        'description': 'Detects edges for precise composition control',
+        'use_case': 'Architecture, products, precise shapes',
+        'parameters': ('sensitivity: low|medium|high',)
+    }),
+    'depth_map': MappingProxyType({
+        'name': 'Depth Map',
+        'description': 'Estimates depth for 3D-aware generation',
+        'use_case': 'Landscapes, portraits, spatial control',
+        'parameters': ()
+    }),
+    'normal_map': MappingProxyType({
+        'name': 'Normal Map',
+        'description': 'Surface normals for texture and lighting control',
+        'use_case': '3D objects, surface details',
+        'parameters': ()
+    }),
+    'hed_edge': MappingProxyType({
+        'name': 'HED Edge Detection',
+        'description': 'Soft edges preserving natural structure',
+        'use_case': 'Natural scenes, organic shapes',
+        'parameters': ()
+    }),
+    'scribble': MappingProxyType({
+        'name': 'Scribble/Sketch',
+        'description': 'Hand-drawn sketch style control',
+        'use_case': 'Conceptual designs, rough layouts',
+        'parameters': ()
+    }),
+    'pose': MappingProxyType({
+        'name': 'Pose Estimation',
+        'description': 'Human pose detection for character control',
+        'use_case': 'Character art, fashion, portraits',
+        'parameters': ()
+    })
+})
+
+# Encoder extension and parameters per output format
+_OUTPUT_FORMATS = {
+    'png': ('.png', [cv2.IMWRITE_PNG_COMPRESSION, 1]),
+    'jpeg': ('.jpg', [cv2.IMWRITE_JPEG_QUALITY, 90])
+}
+
 
 class ControlNetProcessor:
     """
@@ -28,18 +82,43 @@ class ControlNetProcessor:
         'pose',            # Pose estimation (simplified)
     ]
     
+    # Number of constant planes kept for reuse across calls
+    CONST_PLANE_CACHE_SIZE = 8
+    
     def __init__(self):
         self.edge_thresholds = {
             'low': (50, 150),
             'medium': (100, 200),
             'high': (150, 250)
         }
+        self._const_planes: Dict[Tuple[Tuple[int, ...], int], np.ndarray] = {}
+        
+        # Structuring elements shared by every call
+        self._k22 = np.ones((2, 2), np.uint8)
+        self._k5v = np.ones((5, 1), np.uint8)
+        self._k5h = np.ones((1, 5), np.uint8)
+        
+        # Per-thread scratch buffers (grayscale, noise, RGB/BGR output),
+        # reallocated only on shape change, and the current request's Sobel
+        # gradients
+        self._scratch = threading.local()
+        
+        # Control type -> bound processing method
+        self._dispatch = {
+            'canny_edge': self._canny_edge,
+            'depth_map': self._depth_map,
+            'normal_map': self._normal_map,
+            'hed_edge': self._hed_edge,
+            'scribble': self._scribble,
+            'pose': self._pose_estimation
+        }
     
     def process_control_image(
         self,
         image_data: bytes,
         control_type: Literal['canny_edge', 'depth_map', 'normal_map', 'hed_edge', 'scribble', 'pose'],
         strength: float = 1.0,
+        output_format: Literal['png', 'jpeg'] = 'png',
         **kwargs
     ) -> Tuple[bytes, Dict[str, Any]]:
         """
@@ -49,70 +128,55 @@ class ControlNetProcessor:
             image_data: Input image as bytes
             control_type: Type of control processing
             strength: Control strength (0-1), higher = stronger influence
+            output_format: 'png' (lossless, for edge/line outputs) or 'jpeg'
             **kwargs: Additional parameters for specific control types
         
         Returns:
             Tuple of (processed_control_image_bytes, metadata)
         """
         try:
-            # Load image
-            img = Image.open(io.BytesIO(image_data))
-            img_array = np.array(img)
+            process = self._dispatch.get(control_type)
+            if process is None:
+                raise ValueError(f"Unsupported control type: {control_type}")
             
-            # Convert to RGB if needed
-            if len(img_array.shape) == 2:
-                img_array = cv2.cvtColor(img_array, cv2.COLOR_GRAY2RGB)
-            elif img_array.shape[2] == 4:
-                img_array = cv2.cvtColor(img_array, cv2.COLOR_RGBA2RGB)
+            # Decode straight into an ndarray (BGR/BGRA/gray as stored)
+            img_array = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_UNCHANGED)
+            if img_array is None:
+                raise ValueError("Could not decode input image")
+            original_size = (img_array.shape[1], img_array.shape[0])
+            if img_array.dtype != np.uint8:
+                img_array = cv2.convertScaleAbs(img_array, alpha=255.0 / np.iinfo(img_array.dtype).max)
             
-            # Process based on control type
-            if control_type == 'canny_edge':
-                processed = self._canny_edge(img_array, strength, **kwargs)
-                
-            elif control_type == 'depth_map':
-                processed = self._depth_map(img_array, strength, **kwargs)
-                
-            elif control_type == 'normal_map':
-                processed = self._normal_map(img_array, strength, **kwargs)
-                
-            elif control_type == 'hed_edge':
-                processed = self._hed_edge(img_array, strength, **kwargs)
-                
-            elif control_type == 'scribble':
-                processed = self._scribble(img_array, strength, **kwargs)
-                
-            elif control_type == 'pose':
-                processed = self._pose_estimation(img_array, strength, **kwargs)
-                
-            else:
-                raise ValueError(f"Unsupported control type: {control_type}")
+            # Every control type works on grayscale: convert once per request
+            gray = self._to_gray(img_array)
+            self._scratch.sobel = None
             
-            # Convert back to PIL Image
-            processed_img = Image.fromarray(processed)
+            # Process based on control type
+            processed = process(gray, strength, **kwargs)
             
-            # Save to bytes
-            output = io.BytesIO()
-            processed_img.save(output, format='PNG')
-            output.seek(0)
+            # Encode with OpenCV (fast PNG compression level, or JPEG)
+            ext, params = _OUTPUT_FORMATS[output_format]
+            bgr = cv2.cvtColor(processed, cv2.COLOR_RGB2BGR, dst=self._scratch_buffer('bgr', processed.shape))
+            ok, encoded = cv2.imencode(ext, bgr, params)
+            if not ok:
+                raise ValueError(f"Failed to encode control image as {output_format}")
             
             metadata = {
                 'control_type': control_type,
                 'strength': strength,
-                'original_size': img.size,
-                'processed_size': processed_img.size
+                'format': output_format,
+                'original_size': original_size,
+                'processed_size': (processed.shape[1], processed.shape[0])
             }
             
-            return output.read(), metadata
+            return encoded.tobytes(), metadata
             
         except Exception as e:
             logger.error(f"Control image processing failed: {str(e)}")
             raise
     
-    def _canny_edge(self, img_array: np.ndarray, strength: float, **kwargs) -> np.ndarray:
+    def _canny_edge(self, gray: np.ndarray, strength: float, **kwargs) -> np.ndarray:
         """Canny edge detection."""
-        # Convert to grayscale
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        
         # Get thresholds based on strength
         sensitivity = kwargs.get('sensitivity', 'medium')
         low, high = self.edge_thresholds.get(sensitivity, (100, 200))
@@ -128,190 +192,210 @@ class ControlNetProcessor:
         edges = cv2.bitwise_not(edges)
         
         # Convert to RGB
-        edges_rgb = cv2.cvtColor(edges, cv2.COLOR_GRAY2RGB)
+        edges_rgb = self._gray_to_rgb(edges)
         
         return edges_rgb
     
-    def _depth_map(self, img_array: np.ndarray, strength: float, **kwargs) -> np.ndarray:
+    def _depth_map(self, gray: np.ndarray, strength: float, **kwargs) -> np.ndarray:
         """
         Simplified depth map estimation.
         In production, use a proper depth estimation model like MiDaS.
         """
-        # Convert to grayscale
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        
         # Use gradient magnitude as a simple depth proxy
-        grad_x = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-        grad_y = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-        gradient = np.sqrt(grad_x**2 + grad_y**2)
+        grad_x, grad_y = self._sobel(gray)
+        magnitude = cv2.magnitude(grad_x.astype(np.float32), grad_y.astype(np.float32))
         
-        # Normalize
-        gradient = cv2.normalize(gradient, None, 0, 255, cv2.NORM_MINMAX)
-        gradient = gradient.astype(np.uint8)
+        # Scale to 0-255 in the same pass as the 8-bit conversion
+        peak = float(magnitude.max())
+        gradient = cv2.convertScaleAbs(magnitude, alpha=255.0 / peak if peak > 0 else 0.0)
         
         # Invert (darker = farther)
         depth = cv2.bitwise_not(gradient)
         
         # Apply strength
-        depth = cv2.addWeighted(depth, strength, np.ones_like(depth) * 128, 1 - strength, 0)
+        depth = self._blend_const(depth, strength, 128)
         
         # Convert to RGB
-        depth_rgb = cv2.cvtColor(depth.astype(np.uint8), cv2.COLOR_GRAY2RGB)
+        depth_rgb = self._gray_to_rgb(depth)
         
         return depth_rgb
     
-    def _normal_map(self, img_array: np.ndarray, strength: float, **kwargs) -> np.ndarray:
+    def _normal_map(self, gray: np.ndarray, strength: float, **kwargs) -> np.ndarray:
         """
         Generate surface normal map from image.
         Simplified version for demonstration.
         """
-        # Convert to grayscale
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        
         # Calculate gradients
-        grad_x = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-        grad_y = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
+        grad_x, grad_y = self._sobel(gray)
         
         # Create normal map (simplified)
         # R = x gradient, G = y gradient, B = constant
-        normal_map = np.zeros_like(img_array)
-        normal_map[:, :, 0] = cv2.normalize(grad_x, None, 0, 255, cv2.NORM_MINMAX)
-        normal_map[:, :, 1] = cv2.normalize(grad_y, None, 0, 255, cv2.NORM_MINMAX)
-        normal_map[:, :, 2] = 128  # Constant Z
-        
-        # Apply strength
-        normal_map = cv2.addWeighted(normal_map.astype(np.uint8), strength, 
-                                      np.ones_like(normal_map) * 128, 1 - strength, 0)
-        
-        return normal_map.astype(np.uint8)
+        # Min-max scaling to 0-255 and the strength blend toward 128 are
+        # folded into one saturating conversion per channel
+        gx8 = self._scale_to_uint8(grad_x, strength, 128 * (1 - strength))
+        gy8 = self._scale_to_uint8(grad_y, strength, 128 * (1 - strength))
+        normal_map = cv2.merge(
+            (gx8, gy8, self._const_plane(gray.shape, 128)),
+            dst=self._scratch_buffer('rgb', gray.shape + (3,))
+        )
+        
+        return normal_map
+    
+    def _scratch_buffer(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """Reusable per-thread uint8 buffer, reallocated only on shape change."""
+        buf = getattr(self._scratch, name, None)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, np.uint8)
+            setattr(self._scratch, name, buf)
+        return buf
+    
+    def _to_gray(self, img_array: np.ndarray) -> np.ndarray:
+        """
+        Grayscale conversion of a decoded (gray, BGR or BGRA) image into the
+        reusable per-thread scratch buffer.
+        """
+        if img_array.ndim == 2:
+            return img_array
+        gray = self._scratch_buffer('gray', img_array.shape[:2])
+        code = cv2.COLOR_BGRA2GRAY if img_array.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        return cv2.cvtColor(img_array, code, dst=gray)
+    
+    def _gray_to_rgb(self, plane: np.ndarray) -> np.ndarray:
+        """Expand a single-channel result to RGB in the per-thread scratch buffer."""
+        rgb = self._scratch_buffer('rgb', plane.shape + (3,))
+        return cv2.cvtColor(plane, cv2.COLOR_GRAY2RGB, dst=rgb)
+    
+    def _sobel(self, gray: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sobel x/y gradients (CV_16S, exact for 8-bit input with ksize=3) of
+        the current request's grayscale image, computed once per request.
+        """
+        sobel = getattr(self._scratch, 'sobel', None)
+        if sobel is None:
+            sobel = self._scratch.sobel = (
+                cv2.Sobel(gray, cv2.CV_16S, 1, 0, ksize=3),
+                cv2.Sobel(gray, cv2.CV_16S, 0, 1, ksize=3)
+            )
+        return sobel
     
-    def _hed_edge(self, img_array: np.ndarray, strength: float, **kwargs) -> np.ndarray:
+    @staticmethod
+    def _blend_const(img: np.ndarray, strength: float, value: int) -> np.ndarray:
+        """Blend img toward a constant: img * strength + value * (1 - strength)."""
+        # addWeighted saturates to 0-255 like the original blend; convertScaleAbs
+        # would mirror negative results instead
+        return cv2.addWeighted(img, strength, img, 0.0, value * (1.0 - strength))
+    
+    @staticmethod
+    def _scale_to_uint8(values: np.ndarray, gain: float, offset: float) -> np.ndarray:
+        """Min-max scale values to 0-255, then apply gain and offset, as uint8."""
+        lo, hi = cv2.minMaxLoc(values)[:2]
+        alpha = 255.0 / (hi - lo) * gain if hi > lo else 0.0
+        # Saturate rather than convertScaleAbs, which would mirror negatives
+        return cv2.addWeighted(values, alpha, values, 0.0, offset - lo * alpha, dtype=cv2.CV_8U)
+    
+    def _const_plane(self, shape: Tuple[int, ...], value: int) -> np.ndarray:
+        """Read-only constant uint8 plane, cached per (shape, value)."""
+        key = (shape, value)
+        plane = self._const_planes.get(key)
+        if plane is None:
+            if len(self._const_planes) >= self.CONST_PLANE_CACHE_SIZE:
+                self._const_planes.clear()
+            plane = np.full(shape, value, np.uint8)
+            plane.flags.writeable = False
+            self._const_planes[key] = plane
+        return plane
+    
+    def _hed_edge(self, gray: np.ndarray, strength: float, **kwargs) -> np.ndarray:
         """
         Holistically-nested edge detection (simplified).
         In production, use a pre-trained HED model.
         """
         # Use multi-scale edge detection as approximation
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        
-        # Detect edges at multiple scales
-        edges1 = cv2.Canny(gray, 50, 150)
-        edges2 = cv2.Canny(gray, 100, 200)
-        edges3 = cv2.Canny(gray, 150, 250)
-        
-        # Combine
-        combined = cv2.bitwise_or(edges1, cv2.bitwise_or(edges2, edges3))
-        
-        # Invert
-        combined = cv2.bitwise_not(combined)
+        if cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL():
+            # OpenCL device available: keep every pass on it and read back once
+            ugray = cv2.UMat(gray)
+            ucombined = None
+            for low, high in _HED_THRESHOLDS:
+                uedges = cv2.Canny(ugray, low, high)
+                ucombined = uedges if ucombined is None else cv2.bitwise_or(ucombined, uedges)
+            combined = cv2.bitwise_not(ucombined).get()
+        else:
+            # Detect edges at multiple scales concurrently (Canny releases the GIL)
+            futures = [_CV_POOL.submit(cv2.Canny, gray, low, high) for low, high in _HED_THRESHOLDS]
+            edges1, edges2, edges3 = [f.result() for f in futures]
+            
+            # Combine in place into the first mask
+            cv2.bitwise_or(edges1, edges2, dst=edges1)
+            cv2.bitwise_or(edges1, edges3, dst=edges1)
+            combined = edges1
+            
+            # Invert
+            cv2.bitwise_not(combined, dst=combined)
         
         # Apply strength
-        combined = cv2.addWeighted(combined, strength, np.ones_like(combined) * 255, 1 - strength, 0)
+        combined = self._blend_const(combined, strength, 255)
         
         # Convert to RGB
-        edges_rgb = cv2.cvtColor(combined.astype(np.uint8), cv2.COLOR_GRAY2RGB)
+        edges_rgb = self._gray_to_rgb(combined)
         
         return edges_rgb
     
-    def _scribble(self, img_array: np.ndarray, strength: float, **kwargs) -> np.ndarray:
+    def _scribble(self, gray: np.ndarray, strength: float, **kwargs) -> np.ndarray:
         """Process scribble/sketch style control."""
-        # Convert to grayscale
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        
         # Edge detection with low threshold for sketch effect
         edges = cv2.Canny(gray, 30, 100)
         
         # Dilate to make lines thicker (sketch-like)
-        kernel = np.ones((2, 2), np.uint8)
-        sketch = cv2.dilate(edges, kernel, iterations=1)
+        sketch = cv2.dilate(edges, self._k22, iterations=1)
         
         # Invert
-        sketch = cv2.bitwise_not(sketch)
+        cv2.bitwise_not(sketch, dst=sketch)
         
-        # Add some noise for hand-drawn effect
-        noise = np.random.randint(0, 30, sketch.shape, dtype=np.uint8)
-        sketch = cv2.subtract(sketch, noise)
+        # Add some noise for hand-drawn effect: OpenCV's RNG fills a reused
+        # buffer and the saturating subtract runs in place
+        noise = cv2.randu(self._scratch_buffer('noise', sketch.shape), 0, 30)
+        cv2.subtract(sketch, noise, dst=sketch)
         
         # Apply strength
-        sketch = cv2.addWeighted(sketch, strength, np.ones_like(sketch) * 255, 1 - strength, 0)
+        sketch = self._blend_const(sketch, strength, 255)
         
         # Convert to RGB
-        sketch_rgb = cv2.cvtColor(sketch.astype(np.uint8), cv2.COLOR_GRAY2RGB)
+        sketch_rgb = self._gray_to_rgb(sketch)
         
         return sketch_rgb
     
-    def _pose_estimation(self, img_array: np.ndarray, strength: float, **kwargs) -> np.ndarray:
+    def _pose_estimation(self, gray: np.ndarray, strength: float, **kwargs) -> np.ndarray:
         """
         Simplified pose detection.
         In production, use OpenPose or MediaPipe for proper pose estimation.
         """
         # For demonstration, use edge detection with emphasis on vertical structures
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        
         # Detect edges
         edges = cv2.Canny(gray, 100, 200)
         
-        # Emphasize vertical lines (body parts)
-        kernel_vert = np.ones((5, 1), np.uint8)
-        vertical = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel_vert)
-        
-        # Emphasize horizontal lines (shoulders, hips)
-        kernel_horiz = np.ones((1, 5), np.uint8)
-        horizontal = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel_horiz)
+        # Emphasize vertical lines (body parts) and horizontal lines
+        # (shoulders, hips), concurrently
+        vertical_future = _CV_POOL.submit(cv2.morphologyEx, edges, cv2.MORPH_CLOSE, self._k5v)
+        horizontal_future = _CV_POOL.submit(cv2.morphologyEx, edges, cv2.MORPH_CLOSE, self._k5h)
+        vertical, horizontal = vertical_future.result(), horizontal_future.result()
         
-        # Combine
-        pose = cv2.bitwise_or(vertical, horizontal)
+        # Combine in place into the vertical mask
+        pose = cv2.bitwise_or(vertical, horizontal, dst=vertical)
         
         # Invert
-        pose = cv2.bitwise_not(pose)
+        cv2.bitwise_not(pose, dst=pose)
         
         # Apply strength
-        pose = cv2.addWeighted(pose, strength, np.ones_like(pose) * 255, 1 - strength, 0)
+        pose = self._blend_const(pose, strength, 255)
         
         # Convert to RGB
-        pose_rgb = cv2.cvtColor(pose.astype(np.uint8), cv2.COLOR_GRAY2RGB)
+        pose_rgb = self._gray_to_rgb(pose)
         
         return pose_rgb
     
-    def get_control_info(self) -> Dict[str, Dict[str, Any]]:
-        """Get information about available control types."""
-        return {
-            'canny_edge': {
-                'name': 'Canny Edge Detection',
-                'description': 'Detects edges for precise composition control',
-                'use_case': 'Architecture, products, precise shapes',
-                'parameters': ['sensitivity: low|medium|high']
-            },
-            'depth_map': {
-                'name': 'Depth Map',
-                'description': 'Estimates depth for 3D-aware generation',
-                'use_case': 'Landscapes, portraits, spatial control',
-                'parameters': []
-            },
-            'normal_map': {
-                'name': 'Normal Map',
-                'description': 'Surface normals for texture and lighting control',
-                'use_case': '3D objects, surface details',
-                'parameters': []
-            },
-            'hed_edge': {
-                'name': 'HED Edge Detection',
-                'description': 'Soft edges preserving natural structure',
-                'use_case': 'Natural scenes, organic shapes',
-                'parameters': []
-            },
-            'scribble': {
-                'name': 'Scribble/Sketch',
-                'description': 'Hand-drawn sketch style control',
-                'use_case': 'Conceptual designs, rough layouts',
-                'parameters': []
-            },
-            'pose': {
-                'name': 'Pose Estimation',
-                'description': 'Human pose detection for character control',
-                'use_case': 'Character art, fashion, portraits',
-                'parameters': []
-            }
-        }
+    def get_control_info(self) -> Mapping[str, Mapping[str, Any]]:
+        """Get information about available control types (read-only)."""
+        return _CONTROL_INFO
 
 
 # Global instance
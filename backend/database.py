@@ -1,20 +1,58 @@
 """
 Database configuration and models
 """
+import logging
+import random
+import threading
 from sqlalchemy import create_engine, Column, Integer, String, DateTime, JSON, Float, Boolean, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
 from config import settings
 
+# psycopg 3 can switch frequently-run statements to server-side prepared statements;
+# the pinned psycopg2 driver has no equivalent option
+connect_args = {}
+if settings.DATABASE_URL.startswith("postgresql+psycopg://"):
+    connect_args["prepare_threshold"] = 5
+
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
     pool_size=settings.DATABASE_POOL_SIZE,
     max_overflow=settings.DATABASE_MAX_OVERFLOW,
-    echo=settings.DEBUG
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    query_cache_size=1200,
+    connect_args=connect_args,
+    echo=False,
+    echo_pool=False
 )
 
+
+class _SampleFilter(logging.Filter):
+    """Pass only a random fraction of logged SQL statements"""
+    
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self._last = threading.local()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        # The "[...] params" line follows its statement; keep or drop them together
+        if record.msg == "[%s] %r":
+            return getattr(self._last, "keep", False)
+        self._last.keep = random.random() < self.rate
+        return self._last.keep
+
+
+# In debug mode log a sample of SQL statements instead of echoing every one
+if settings.DEBUG and settings.SQLALCHEMY_LOG_SAMPLE > 0:
+    _sql_logger = logging.getLogger("sqlalchemy.engine.Engine")
+    _sql_logger.setLevel(logging.INFO)
+    _sql_logger.addFilter(_SampleFilter(settings.SQLALCHEMY_LOG_SAMPLE))
+
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -22,6 +60,32 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+class utcnow(FunctionElement):
+    """
+    Current UTC time evaluated by the database, as a naive timestamp
+    (matching the datetime.utcnow() values the application compares against)
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    # CURRENT_TIMESTAMP is UTC on SQLite
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
+# Timestamp columns render utcnow() into every INSERT (default=) as well as
+# declaring it as the column default (server_default=); create_all leaves
+# existing tables unchanged, so tables created before the server default
+# still get timestamps from the database clock
+
+
 class User(Base):
     """User model"""
     __tablename__ = "users"
@@ -32,8 +96,8 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow(), server_default=utcnow())
+    updated_at = Column(DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow())
 
 
 class Project(Base):
@@ -46,8 +110,8 @@ class Project(Base):
     description = Column(Text)
     project_type = Column(String)  # ecommerce, social_media, game_asset, etc.
     settings = Column(JSON)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow(), server_default=utcnow())
+    updated_at = Column(DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow())
 
 
 class Generation(Base):
@@ -65,7 +129,7 @@ class Generation(Base):
     generation_time = Column(Float)
     status = Column(String, default="pending")  # pending, processing, completed, failed
     error_message = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow(), server_default=utcnow())
     completed_at = Column(DateTime)
 
 
@@ -83,7 +147,7 @@ class Workflow(Base):
     total_generations = Column(Integer, default=0)
     completed_generations = Column(Integer, default=0)
     failed_generations = Column(Integer, default=0)
-    started_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, default=utcnow(), server_default=utcnow())
     completed_at = Column(DateTime)
 
 
@@ -99,8 +163,8 @@ class Template(Base):
     parameters = Column(JSON)
     is_public = Column(Boolean, default=False)
     usage_count = Column(Integer, default=0)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow(), server_default=utcnow())
+    updated_at = Column(DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow())
 
 
 class BrandGuideline(Base):
@@ -114,8 +178,8 @@ class BrandGuideline(Base):
     visual_style = Column(JSON)
     brand_tone = Column(JSON)
     content_policy = Column(JSON)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow(), server_default=utcnow())
+    updated_at = Column(DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow())
 
 
 def get_db():
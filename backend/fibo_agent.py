@@ -1,14 +1,26 @@
 """
 AI Agent for intelligent parameter generation and optimization
 """
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, Optional, List
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple
 from openai import AsyncOpenAI
 from config import settings
-import json
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Bound on in-flight OpenAI requests across all agent calls
+_OPENAI_SEMAPHORE = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
+
+
+def _pretty_json(data: Any) -> str:
+    """Indented JSON for embedding in prompts"""
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+
 
 class FIBOAgent:
     """
@@ -22,6 +34,9 @@ class FIBOAgent:
         self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         self.model = settings.OPENAI_MODEL
         
+        # (model, user_input, context digest) -> (expires_at, raw JSON reply)
+        self._intent_cache: "OrderedDict[Tuple[str, str, str], Tuple[float, bytes]]" = OrderedDict()
+        
         self.system_prompt = """You are an expert AI visual creative director specializing in photography, cinematography, and visual design. Your role is to understand creative intent and translate it into optimal technical parameters for image generation using the Bria FIBO system.
 
 FIBO supports the following parameters:
@@ -40,27 +55,61 @@ Your task is to:
 
 Always respond with valid JSON containing the parameters and reasoning."""
     
-    async def analyze_intent(
+    async def _stream_completion(
         self,
-        user_input: str,
-        context: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
+        user_message: str,
+        temperature: float
+    ) -> AsyncIterator[str]:
         """
-        Analyze user input to understand creative intent
-        
-        Args:
-            user_input: User's description of what they want
-            context: Additional context (brand guidelines, project type, etc.)
-        
-        Returns:
-            Dictionary containing analysis and suggested parameters
+        Stream a JSON-mode completion, yielding content tokens as they arrive
         """
-        try:
-            context_str = ""
-            if context:
-                context_str = f"\n\nAdditional context: {json.dumps(context, indent=2)}"
-            
-            user_message = f"""Analyze this creative request and suggest optimal FIBO parameters:
+        async with _OPENAI_SEMAPHORE:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": user_message}
+                ],
+                temperature=temperature,
+                response_format={"type": "json_object"},
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    
+    async def _complete_raw(self, user_message: str, temperature: float) -> bytes:
+        """
+        Run a streamed completion and return the collected JSON reply
+        """
+        buf = bytearray()
+        async for token in self._stream_completion(user_message, temperature):
+            buf += token.encode()
+        return bytes(buf)
+    
+    async def _complete_json(self, user_message: str, temperature: float) -> Dict[str, Any]:
+        """
+        Run a streamed completion and parse the collected JSON reply
+        """
+        return orjson.loads(await self._complete_raw(user_message, temperature))
+    
+    def _intent_key(self, user_input: str, context: Optional[Dict[str, Any]]) -> Tuple[str, str, str]:
+        """Cache key for analyze_intent"""
+        context_bytes = orjson.dumps(
+            context,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+            default=str
+        )
+        digest = hashlib.blake2b(context_bytes, digest_size=16).hexdigest()
+        return (self.model, user_input, digest)
+    
+    def _intent_message(self, user_input: str, context: Optional[Dict[str, Any]]) -> str:
+        """Build the analyze_intent user prompt"""
+        context_str = ""
+        if context:
+            context_str = f"\n\nAdditional context: {_pretty_json(context)}"
+        
+        return f"""Analyze this creative request and suggest optimal FIBO parameters:
 
 Request: {user_input}{context_str}
 
@@ -89,18 +138,41 @@ Respond with JSON in this format:
         {{"name": "variation 2 name", "changes": {{"parameter": "value"}}}}
     ]
 }}"""
+    
+    async def analyze_intent(
+        self,
+        user_input: str,
+        context: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Analyze user input to understand creative intent
+        
+        Args:
+            user_input: User's description of what they want
+            context: Additional context (brand guidelines, project type, etc.)
+        
+        Returns:
+            Dictionary containing analysis and suggested parameters
+        """
+        try:
+            key = self._intent_key(user_input, context)
+            cached = self._intent_cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                self._intent_cache.move_to_end(key)
+                logger.info(f"Intent analysis served from cache for: {user_input}")
+                # Parse a fresh copy; callers update the returned parameters
+                return orjson.loads(cached[1])
             
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.7,
-                response_format={"type": "json_object"}
-            )
+            user_message = self._intent_message(user_input, context)
+            
+            raw = await self._complete_raw(user_message, temperature=0.7)
+            result = orjson.loads(raw)
+            
+            self._intent_cache[key] = (time.monotonic() + settings.AGENT_CACHE_TTL, raw)
+            self._intent_cache.move_to_end(key)
+            while len(self._intent_cache) > settings.AGENT_CACHE_SIZE:
+                self._intent_cache.popitem(last=False)
             
-            result = json.loads(response.choices[0].message.content)
             logger.info(f"Intent analyzed successfully for: {user_input}")
             return result
             
@@ -108,6 +180,25 @@ Respond with JSON in this format:
             logger.error(f"Error analyzing intent: {str(e)}")
             raise
     
+    async def analyze_intent_stream(
+        self,
+        user_input: str,
+        context: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream the raw JSON reply of analyze_intent token by token
+        
+        Args:
+            user_input: User's description of what they want
+            context: Additional context (brand guidelines, project type, etc.)
+        
+        Yields:
+            JSON text fragments as they are received
+        """
+        user_message = self._intent_message(user_input, context)
+        async for token in self._stream_completion(user_message, temperature=0.7):
+            yield token
+    
     async def optimize_parameters(
         self,
         current_params: Dict[str, Any],
@@ -132,23 +223,13 @@ Respond with JSON in this format:
             
             user_message = f"""Given these current parameters and feedback, suggest optimizations:
 
-Current parameters: {json.dumps(current_params, indent=2)}
+Current parameters: {_pretty_json(current_params)}
 
 Feedback: {feedback}{quality_info}
 
 Respond with JSON containing optimized parameters and explanation of changes."""
             
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.5,
-                response_format={"type": "json_object"}
-            )
-            
-            result = json.loads(response.choices[0].message.content)
+            result = await self._complete_json(user_message, temperature=0.5)
             logger.info("Parameters optimized successfully")
             return result
             
@@ -174,7 +255,7 @@ Respond with JSON containing optimized parameters and explanation of changes."""
         try:
             user_message = f"""Plan a {workflow_type} workflow with these inputs:
 
-{json.dumps(input_data, indent=2)}
+{_pretty_json(input_data)}
 
 Create a detailed workflow plan with multiple generation steps. Respond with JSON:
 {{
@@ -192,17 +273,7 @@ Create a detailed workflow plan with multiple generation steps. Respond with JSO
     "strategy": "overall strategy explanation"
 }}"""
             
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.6,
-                response_format={"type": "json_object"}
-            )
-            
-            result = json.loads(response.choices[0].message.content)
+            result = await self._complete_json(user_message, temperature=0.6)
             logger.info(f"Workflow planned: {workflow_type}")
             return result
             
@@ -229,7 +300,7 @@ Create a detailed workflow plan with multiple generation steps. Respond with JSO
             user_message = f"""Analyze this generated image and provide a quality score.
 
 Image URL: {image_url}
-Expected parameters: {json.dumps(expected_parameters, indent=2)}
+Expected parameters: {_pretty_json(expected_parameters)}
 
 Respond with JSON:
 {{
@@ -244,17 +315,7 @@ Respond with JSON:
     "suggestions": ["improvement 1", "improvement 2"]
 }}"""
             
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.3,
-                response_format={"type": "json_object"}
-            )
-            
-            result = json.loads(response.choices[0].message.content)
+            result = await self._complete_json(user_message, temperature=0.3)
             logger.info("Quality scored successfully")
             return result
             
@@ -286,31 +347,25 @@ Respond with JSON:
             List of parameter variations
         """
         try:
-            user_message = f"""Generate {count} {variation_type} variations of these parameters:
+            # One request for the whole set, so the model sees every variation
+            # it has produced and the base parameters are sent once
+            user_message = f"""Generate {count} distinct {variation_type} variations of these parameters:
 
-Base parameters: {json.dumps(base_params, indent=2)}
+Base parameters: {_pretty_json(base_params)}
 
-Respond with JSON array of variations:
-[
-    {{
-        "name": "variation name",
-        "parameters": {{...modified FIBO parameters...}},
-        "description": "what makes this unique"
-    }}
-]"""
-            
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.8,
-                response_format={"type": "json_object"}
-            )
+Respond with JSON:
+{{
+    "variations": [
+        {{
+            "name": "variation name",
+            "parameters": {{...modified FIBO parameters...}},
+            "description": "what makes this unique"
+        }}
+    ]
+}}"""
             
-            result = json.loads(response.choices[0].message.content)
-            variations = result.get("variations", [])
+            result = await self._complete_json(user_message, temperature=0.8)
+            variations = result.get("variations", [])[:count]
             logger.info(f"Generated {len(variations)} variations")
             return variations
             
@@ -2,16 +2,161 @@
 FIBO Integration Layer
 Handles all communication with Bria FIBO API
 """
+import asyncio
+import hashlib
 import httpx
 import logging
-from typing import Dict, Any, Optional, List
+import time
+import orjson
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from types import MappingProxyType
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator, Mapping, Deque
 from config import settings
+from http_clients import get_fibo_client, get_redis_client
 import base64
 import io
 from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+# Seconds to skip Redis after a connection failure
+_REDIS_RETRY_SECONDS = 30.0
+
+# A successful upstream call within this window counts as a passing connection test
+_CONNECTION_OK_SECONDS = 300.0
+
+# Valid values of each FIBO parameter, shared read-only by every caller
+_PARAMETER_OPTIONS: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    "camera_angle": (
+        "eye-level",
+        "low-angle",
+        "high-angle",
+        "dutch-tilt",
+        "bird's-eye",
+        "worm's-eye",
+        "over-the-shoulder"
+    ),
+    "fov": (
+        "wide",
+        "standard",
+        "telephoto",
+        "ultra-wide",
+        "macro"
+    ),
+    "lighting": (
+        "natural",
+        "studio",
+        "dramatic",
+        "golden-hour",
+        "soft",
+        "hard",
+        "rim",
+        "backlit",
+        "three-point"
+    ),
+    "color_palette": (
+        "vibrant",
+        "pastel",
+        "monochrome",
+        "warm",
+        "cool",
+        "neon",
+        "earth-tones",
+        "jewel-tones"
+    ),
+    "composition": (
+        "rule-of-thirds",
+        "centered",
+        "dynamic",
+        "minimal",
+        "symmetrical",
+        "leading-lines",
+        "frame-within-frame"
+    ),
+    "style": (
+        "photorealistic",
+        "cinematic",
+        "editorial",
+        "commercial",
+        "artistic",
+        "documentary",
+        "fashion",
+        "product"
+    )
+})
+
+
+class AdmissionController:
+    """
+    Concurrency limit for upstream calls that can be resized at runtime
+    
+    Raising the limit wakes waiters immediately; lowering it takes effect
+    passively as in-flight calls finish. Slots are handed to waiters in FIFO
+    order, and release() never awaits, so a cancelled caller cannot leak its
+    slot or swallow the wakeup meant for the next waiter.
+    """
+    
+    def __init__(self, limit: int):
+        self._active = 0
+        self._limit = limit
+        self._waiters: Deque[asyncio.Future] = deque()
+    
+    @property
+    def limit(self) -> int:
+        return self._limit
+    
+    @property
+    def active(self) -> int:
+        return self._active
+    
+    def _wake(self) -> None:
+        # The slot is counted before the waiter resumes, so it cannot be taken twice
+        while self._waiters and self._active < self._limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._active += 1
+                waiter.set_result(None)
+    
+    async def acquire(self) -> None:
+        if self._active < self._limit and not self._waiters:
+            self._active += 1
+            return
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot but cancelled before resuming: pass it on
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+    
+    def release(self) -> None:
+        self._active -= 1
+        self._wake()
+    
+    def resize(self, limit: int) -> None:
+        if limit < 1:
+            raise ValueError("Concurrency limit must be at least 1")
+        self._limit = limit
+        self._wake()
+    
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one admission slot for the duration of the block"""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
 
 class FIBOIntegration:
     """
@@ -19,16 +164,55 @@ class FIBOIntegration:
     Handles image generation with full parameter control
     """
     
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self._client = client
+        
+        # Bound on concurrent upstream generation calls (single and batch)
+        self.admission = AdmissionController(settings.FIBO_MAX_CONCURRENCY)
+        self.rate_limited_count = 0
         self.api_key = settings.FIBO_API_KEY or settings.FAL_API_KEY
         self.api_url = settings.FIBO_API_URL if settings.FIBO_API_KEY else settings.FAL_API_URL
         self.use_fal = not settings.FIBO_API_KEY
         
         if not self.api_key:
             raise ValueError("FIBO_API_KEY or FAL_API_KEY must be configured")
+        
+        # Fixed per instance: built once, reused by every request
+        self._headers = self._build_headers()
+        self._base_params = {
+            "sync": True,  # Synchronous mode for immediate response
+            "model_version": "FIBO"
+        }
+        
+        # Default dimensions if not provided
+        self._default_enhancements = {
+            "width": settings.DEFAULT_IMAGE_WIDTH,
+            "height": settings.DEFAULT_IMAGE_HEIGHT
+        }
+        # HDR and 16-bit support if enabled, quality set to maximum
+        self._forced_enhancements = {"quality": settings.DEFAULT_QUALITY}
+        if settings.HDR_ENABLED:
+            self._forced_enhancements.update(
+                hdr=True,
+                color_depth=settings.DEFAULT_COLOR_DEPTH,
+                color_space=settings.DEFAULT_COLOR_SPACE
+            )
+        
+        # Response cache: in-process LRU (key -> (expires_at, JSON result)) in
+        # front of a shared Redis layer
+        self._cache: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._redis_retry_at = 0.0
+        
+        # Monotonic time of the last successful upstream response
+        self._last_ok = 0.0
     
-    def _get_headers(self) -> Dict[str, str]:
-        """Get API request headers for Bria V2 API"""
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """HTTP client: the injected one, or the shared pooled client"""
+        return self._client or get_fibo_client()
+    
+    def _build_headers(self) -> Dict[str, str]:
+        """Build API request headers for Bria V2 API"""
         if self.use_fal:
             return {
                 "Authorization": f"Key {self.api_key}",
@@ -41,28 +225,95 @@ class FIBOIntegration:
                 "Content-Type": "application/json"
             }
     
+    def _get_headers(self) -> Dict[str, str]:
+        """Get API request headers for Bria V2 API"""
+        return self._headers
+    
+    @staticmethod
+    def _cache_key(params: Dict[str, Any], parameters: Dict[str, Any]) -> str:
+        """Content hash of a generation request"""
+        payload = orjson.dumps(
+            {"request": params, "parameters": parameters},
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+            default=str
+        )
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+    
+    async def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached generation result (memory first, then Redis)"""
+        entry = self._cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            return orjson.loads(entry[1])
+        
+        redis = get_redis_client()
+        if redis is None or time.monotonic() < self._redis_retry_at:
+            return None
+        try:
+            cached = await redis.get(f"fibo:{key}")
+        except Exception as e:
+            logger.warning(f"Redis cache unavailable: {str(e)}")
+            self._redis_retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+            return None
+        if cached is None:
+            return None
+        self._cache_store_local(key, cached)
+        return orjson.loads(cached)
+    
+    def _cache_store_local(self, key: str, payload: bytes) -> None:
+        """Insert into the in-process LRU, evicting the oldest entries"""
+        self._cache[key] = (time.monotonic() + settings.FIBO_CACHE_TTL, payload)
+        self._cache.move_to_end(key)
+        while len(self._cache) > settings.FIBO_CACHE_SIZE:
+            self._cache.popitem(last=False)
+    
+    async def _cache_set(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a generation result in both cache layers"""
+        payload = orjson.dumps(result, default=str)
+        self._cache_store_local(key, payload)
+        
+        redis = get_redis_client()
+        if redis is None or time.monotonic() < self._redis_retry_at:
+            return
+        try:
+            await redis.setex(f"fibo:{key}", settings.REDIS_CACHE_TTL, payload)
+        except Exception as e:
+            logger.warning(f"Redis cache unavailable: {str(e)}")
+            self._redis_retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+    
     def _enhance_parameters(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
         Enhance parameters with professional settings
         """
-        enhanced = params.copy()
-        
-        # Add HDR and 16-bit support if enabled
-        if settings.HDR_ENABLED:
-            enhanced['hdr'] = True
-            enhanced['color_depth'] = settings.DEFAULT_COLOR_DEPTH
-            enhanced['color_space'] = settings.DEFAULT_COLOR_SPACE
-        
-        # Set quality to maximum
-        enhanced['quality'] = settings.DEFAULT_QUALITY
-        
-        # Set default dimensions if not provided
-        if 'width' not in enhanced:
-            enhanced['width'] = settings.DEFAULT_IMAGE_WIDTH
-        if 'height' not in enhanced:
-            enhanced['height'] = settings.DEFAULT_IMAGE_HEIGHT
+        # Defaults are overridden by caller params; forced settings win over both
+        return {**self._default_enhancements, **params, **self._forced_enhancements}
+    
+    def _build_request(
+        self,
+        prompt: str,
+        camera_angle: Optional[str],
+        fov: Optional[str],
+        lighting: Optional[str],
+        color_palette: Optional[str],
+        composition: Optional[str],
+        style: Optional[str],
+        additional_params: Optional[Dict[str, Any]]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Build the full prompt and the V2 API request body"""
+        # Add FIBO-specific parameters to prompt for V2 API
+        pairs = (
+            ("camera angle", camera_angle),
+            ("field of view", fov),
+            ("lighting", lighting),
+            ("color palette", color_palette),
+            ("composition", composition),
+            ("style", style)
+        )
+        extras = ", ".join(f"{name}: {value}" for name, value in pairs if value)
+        full_prompt = f"{prompt}, {extras}" if extras else prompt
         
-        return enhanced
+        # Bria V2 API request format, plus any additional parameters
+        return full_prompt, {"prompt": full_prompt, **self._base_params, **(additional_params or {})}
     
     async def generate(
         self,
@@ -73,7 +324,8 @@ class FIBOIntegration:
         color_palette: Optional[str] = None,
         composition: Optional[str] = None,
         style: Optional[str] = None,
-        additional_params: Optional[Dict[str, Any]] = None
+        additional_params: Optional[Dict[str, Any]] = None,
+        cache_bypass: bool = False
     ) -> Dict[str, Any]:
         """
         Generate image using FIBO API
@@ -87,59 +339,52 @@ class FIBOIntegration:
             composition: Composition style (rule-of-thirds, centered, dynamic, minimal)
             style: Visual style (photorealistic, cinematic, editorial, commercial)
             additional_params: Any additional parameters
+            cache_bypass: Skip the response cache (e.g. for random seeds)
         
         Returns:
             Dictionary containing generation results
         """
         try:
-            # Build prompt with FIBO parameters embedded
-            full_prompt = prompt
-            
-            # Add FIBO-specific parameters to prompt for V2 API
-            if camera_angle or fov or lighting or color_palette or composition or style:
-                param_descriptions = []
-                if camera_angle:
-                    param_descriptions.append(f"camera angle: {camera_angle}")
-                if fov:
-                    param_descriptions.append(f"field of view: {fov}")
-                if lighting:
-                    param_descriptions.append(f"lighting: {lighting}")
-                if color_palette:
-                    param_descriptions.append(f"color palette: {color_palette}")
-                if composition:
-                    param_descriptions.append(f"composition: {composition}")
-                if style:
-                    param_descriptions.append(f"style: {style}")
-                
-                full_prompt = f"{prompt}, {', '.join(param_descriptions)}"
-            
-            # Bria V2 API request format
-            params = {
-                "prompt": full_prompt,
-                "sync": True,  # Synchronous mode for immediate response
-                "model_version": "FIBO"
+            full_prompt, params = self._build_request(
+                prompt, camera_angle, fov, lighting, color_palette, composition, style, additional_params
+            )
+            parameters = {
+                "prompt": prompt,
+                "camera_angle": camera_angle,
+                "fov": fov,
+                "lighting": lighting,
+                "color_palette": color_palette,
+                "composition": composition,
+                "style": style
             }
             
-            # Add additional parameters
-            if additional_params:
-                params.update(additional_params)
+            cache_key = None
+            if not cache_bypass:
+                cache_key = self._cache_key(params, parameters)
+                cached = await self._cache_get(cache_key)
+                if cached is not None:
+                    logger.info(f"Serving cached FIBO generation: {full_prompt[:100]}...")
+                    return cached
             
             logger.info(f"Generating image with FIBO V2 API: {full_prompt[:100]}...")
             logger.debug(f"Request parameters: {params}")
             
             # Make API request
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                response = await client.post(
+            async with self.admission.slot():
+                response = await self.client.post(
                     self.api_url,
                     headers=self._get_headers(),
-                    json=params
+                    content=orjson.dumps(params)
                 )
-                
-                logger.debug(f"Response status: {response.status_code}")
-                logger.debug(f"Response headers: {dict(response.headers)}")
-                
-                response.raise_for_status()
-                result = response.json()
+            if response.status_code == 429:
+                self.rate_limited_count += 1
+            
+            logger.debug(f"Response status: {response.status_code}")
+            logger.debug(f"Response headers: {dict(response.headers)}")
+            
+            response.raise_for_status()
+            self._last_ok = time.monotonic()
+            result = orjson.loads(response.content)
             
             logger.info("Image generated successfully with FIBO V2")
             
@@ -152,20 +397,15 @@ class FIBOIntegration:
             elif "url" in result:
                 image_url = result["url"]
             
-            return {
+            generation = {
                 "status": "success",
                 "image_url": image_url,
-                "parameters": {
-                    "prompt": prompt,
-                    "camera_angle": camera_angle,
-                    "fov": fov,
-                    "lighting": lighting,
-                    "color_palette": color_palette,
-                    "composition": composition,
-                    "style": style
-                },
+                "parameters": parameters,
                 "raw_response": result
             }
+            if cache_key is not None:
+                await self._cache_set(cache_key, generation)
+            return generation
             
         except httpx.HTTPError as e:
             logger.error(f"HTTP error during generation: {str(e)}")
@@ -176,6 +416,44 @@ class FIBOIntegration:
             logger.error(f"Error during generation: {str(e)}")
             raise
     
+    async def generate_stream(
+        self,
+        prompt: str,
+        camera_angle: Optional[str] = None,
+        fov: Optional[str] = None,
+        lighting: Optional[str] = None,
+        color_palette: Optional[str] = None,
+        composition: Optional[str] = None,
+        style: Optional[str] = None,
+        additional_params: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Generate image using FIBO API, passing the response body through as it arrives
+        
+        Takes the same arguments as generate(). The generation slot is held
+        for the whole lifetime of the stream.
+        
+        Yields:
+            Raw chunks of the upstream JSON response
+        """
+        full_prompt, params = self._build_request(
+            prompt, camera_angle, fov, lighting, color_palette, composition, style, additional_params
+        )
+        logger.info(f"Streaming image generation with FIBO V2 API: {full_prompt[:100]}...")
+        
+        async with self.admission.slot():
+            async with self.client.stream(
+                "POST",
+                self.api_url,
+                headers=self._get_headers(),
+                content=orjson.dumps(params)
+            ) as response:
+                if response.status_code == 429:
+                    self.rate_limited_count += 1
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(chunk_size=8192):
+                    yield chunk
+    
     async def batch_generate(
         self,
         requests: List[Dict[str, Any]]
@@ -194,21 +472,22 @@ class FIBOIntegration:
         
         logger.info(f"Batch generating {len(requests)} images")
         
-        results = []
-        for i, request in enumerate(requests):
+        async def _one(i: int, request: Dict[str, Any]) -> Dict[str, Any]:
             try:
                 result = await self.generate(**request)
-                results.append(result)
                 logger.info(f"Completed {i+1}/{len(requests)}")
+                return result
             except Exception as e:
                 logger.error(f"Failed to generate image {i+1}: {str(e)}")
-                results.append({
+                return {
                     "status": "failed",
                     "error": str(e),
                     "request": request
-                })
+                }
         
-        return results
+        # Run concurrently (bounded by the admission controller inside
+        # generate); results keep the request order
+        return list(await asyncio.gather(*(_one(i, r) for i, r in enumerate(requests))))
     
     async def refine(
         self,
@@ -235,14 +514,13 @@ class FIBOIntegration:
             
             logger.info(f"Refining image: {image_url}")
             
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                response = await client.post(
-                    f"{self.api_url}/refine",
-                    headers=self._get_headers(),
-                    json=params
-                )
-                response.raise_for_status()
-                result = response.json()
+            response = await self.client.post(
+                f"{self.api_url}/refine",
+                headers=self._get_headers(),
+                content=orjson.dumps(params)
+            )
+            response.raise_for_status()
+            result = orjson.loads(response.content)
             
             return {
                 "status": "success",
@@ -255,88 +533,47 @@ class FIBOIntegration:
             logger.error(f"Error during refinement: {str(e)}")
             raise
     
-    def get_parameter_options(self) -> Dict[str, List[str]]:
+    def get_parameter_options(self) -> Mapping[str, Tuple[str, ...]]:
         """
         Get all available parameter options
         
         Returns:
-            Dictionary of parameter names and their valid values
+            Read-only mapping of parameter names to their valid values
         """
-        return {
-            "camera_angle": [
-                "eye-level",
-                "low-angle",
-                "high-angle",
-                "dutch-tilt",
-                "bird's-eye",
-                "worm's-eye",
-                "over-the-shoulder"
-            ],
-            "fov": [
-                "wide",
-                "standard",
-                "telephoto",
-                "ultra-wide",
-                "macro"
-            ],
-            "lighting": [
-                "natural",
-                "studio",
-                "dramatic",
-                "golden-hour",
-                "soft",
-                "hard",
-                "rim",
-                "backlit",
-                "three-point"
-            ],
-            "color_palette": [
-                "vibrant",
-                "pastel",
-                "monochrome",
-                "warm",
-                "cool",
-                "neon",
-                "earth-tones",
-                "jewel-tones"
-            ],
-            "composition": [
-                "rule-of-thirds",
-                "centered",
-                "dynamic",
-                "minimal",
-                "symmetrical",
-                "leading-lines",
-                "frame-within-frame"
-            ],
-            "style": [
-                "photorealistic",
-                "cinematic",
-                "editorial",
-                "commercial",
-                "artistic",
-                "documentary",
-                "fashion",
-                "product"
-            ]
-        }
+        return _PARAMETER_OPTIONS
     
     async def test_connection(self) -> bool:
         """
         Test connection to FIBO API
         
+        Reuses a recent successful generation when there is one, otherwise
+        sends a HEAD probe; never starts an image generation.
+        
         Returns:
             True if connection successful
         """
+        if time.monotonic() - self._last_ok < _CONNECTION_OK_SECONDS:
+            return True
+        
         try:
-            result = await self.generate(
-                prompt="test image",
-                style="photorealistic"
+            response = await self.client.head(
+                self.api_url,
+                headers=self._get_headers(),
+                timeout=5.0
             )
-            return result.get("status") == "success"
-        except Exception as e:
+        except httpx.HTTPError as e:
             logger.error(f"Connection test failed: {str(e)}")
             return False
+        
+        if response.status_code in (401, 403):
+            logger.error(f"Connection test failed: API key rejected ({response.status_code})")
+            return False
+        if response.status_code >= 500:
+            logger.error(f"Connection test failed: upstream returned {response.status_code}")
+            return False
+        
+        self._last_ok = time.monotonic()
+        return True
 
 
 # Create singleton instance with fallback to mock
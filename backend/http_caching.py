@@ -0,0 +1,39 @@
+"""
+Conditional GET helpers
+ETags and If-None-Match handling shared by routers that serve constant bodies
+"""
+import hashlib
+import re
+from typing import Optional
+from fastapi import Response
+
+# One entity-tag in an If-None-Match list; the quoted part is the opaque tag
+_ENTITY_TAG_RE = re.compile(r'(?:W/)?("[^"]*")')
+
+
+def etag(body: bytes) -> str:
+    """Strong ETag for a pre-serialized response body"""
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], current: str) -> bool:
+    """
+    Whether an If-None-Match header matches the current ETag
+    
+    Uses the weak comparison If-None-Match calls for: "*" matches anything,
+    W/ prefixes are ignored, and the header may list several tags.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = current[2:] if current.startswith("W/") else current
+    return opaque in _ENTITY_TAG_RE.findall(if_none_match)
+
+
+def static_json_response(body: bytes, current_etag: str, if_none_match: Optional[str]) -> Response:
+    """Serve constant JSON bytes, answering 304 when the client copy is current"""
+    headers = {"ETag": current_etag}
+    if etag_matches(if_none_match, current_etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
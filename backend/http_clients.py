@@ -0,0 +1,78 @@
+"""
+Shared HTTP and Redis clients
+Long-lived connection pools reused across requests
+"""
+import httpx
+import importlib.util
+import logging
+from typing import Optional
+from config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Redis caching stays disabled without the client library
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 multiplexing needs the optional h2 package (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_fibo_client: Optional[httpx.AsyncClient] = None
+_redis_client = None
+
+
+def _create_fibo_client() -> httpx.AsyncClient:
+    """Create the pooled client used for FIBO API calls"""
+    if not HTTP2_AVAILABLE:
+        logger.warning("h2 not installed, FIBO HTTP client falls back to HTTP/1.1")
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=100, max_connections=1000),
+        timeout=httpx.Timeout(connect=5.0, read=120.0, write=30.0, pool=None),
+        http2=HTTP2_AVAILABLE
+    )
+
+
+def get_fibo_client() -> httpx.AsyncClient:
+    """
+    Get the shared FIBO API client, creating it on first use
+
+    Returns:
+        The process-wide AsyncClient
+    """
+    global _fibo_client
+    if _fibo_client is None or _fibo_client.is_closed:
+        _fibo_client = _create_fibo_client()
+        logger.info("FIBO HTTP client created")
+    return _fibo_client
+
+
+def get_redis_client():
+    """
+    Get the shared Redis client, creating it on first use
+
+    Returns:
+        A redis.asyncio.Redis client, or None if the redis package is missing
+    """
+    global _redis_client
+    if aioredis is None:
+        return None
+    if _redis_client is None:
+        _redis_client = aioredis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=0.5,
+            socket_timeout=0.5
+        )
+    return _redis_client
+
+
+async def close_http_clients() -> None:
+    """Close the shared clients and their pooled connections"""
+    global _fibo_client, _redis_client
+    if _fibo_client is not None:
+        await _fibo_client.aclose()
+        _fibo_client = None
+        logger.info("FIBO HTTP client closed")
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client = None
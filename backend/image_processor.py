@@ -3,15 +3,116 @@ Professional image processing module for HDR and 16-bit export capabilities.
 Supports multiple color spaces, tone mapping algorithms, and export formats.
 """
 
+import asyncio
+import functools
 import io
+import os
+import threading
 import numpy as np
 from PIL import Image
 import cv2
-from typing import Optional, Dict, Any, Literal
+import anyio.to_thread
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Literal, Mapping
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Worker processes for very large images, created on first use
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Get the shared process pool, creating it on first use."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+        return _process_pool
+
+
+def _process_in_worker(image_data: bytes, kwargs: Dict[str, Any]) -> tuple[bytes, Dict[str, Any]]:
+    """Process pool entry point (module level so it can be pickled)."""
+    return image_processor.process_image(image_data, **kwargs)
+
+
+def _process_tile(tile: np.ndarray, tone_mapping: str, gain: float, bit_depth: int) -> np.ndarray:
+    """Process pool entry point for one row tile of a very large image."""
+    return image_processor._process_pixels(tile, tone_mapping, gain, bit_depth)
+
+
+# Processing parameters of the quick presets, shared read-only by every caller
+_PRESET_PARAMS: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    'web': MappingProxyType({
+        'format': 'webp',
+        'bit_depth': 8,
+        'color_space': 'srgb',
+        'tone_mapping': 'none',
+        'quality': 85
+    }),
+    'print': MappingProxyType({
+        'format': 'tiff',
+        'bit_depth': 16,
+        'color_space': 'adobe_rgb',
+        'tone_mapping': 'none',
+        'compression': 'lzw'
+    }),
+    'film_tv': MappingProxyType({
+        'format': 'tiff',
+        'bit_depth': 16,
+        'color_space': 'rec2020',
+        'tone_mapping': 'aces',
+        'compression': 'none'
+    }),
+    'cinema': MappingProxyType({
+        'format': 'exr',
+        'bit_depth': 32,
+        'color_space': 'dci_p3',
+        'tone_mapping': 'filmic',
+        'compression': 'zip'
+    }),
+    'games': MappingProxyType({
+        'format': 'png',
+        'bit_depth': 8,
+        'color_space': 'srgb',
+        'tone_mapping': 'uncharted2',
+        'compress_level': 9
+    })
+})
+
+
+# Descriptions of the quick presets, shared read-only by every caller
+_AVAILABLE_PRESETS: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    'web': MappingProxyType({
+        'name': 'Web Optimized',
+        'description': 'Optimized for web (WebP, 8-bit, sRGB)',
+        'use_case': 'Websites, social media, online galleries'
+    }),
+    'print': MappingProxyType({
+        'name': 'Print Production',
+        'description': 'High quality for print (TIFF, 16-bit, Adobe RGB)',
+        'use_case': 'Magazines, posters, professional printing'
+    }),
+    'film_tv': MappingProxyType({
+        'name': 'Film & TV',
+        'description': 'Broadcast quality (TIFF, 16-bit, Rec.2020, ACES)',
+        'use_case': 'Television production, streaming, HDR content'
+    }),
+    'cinema': MappingProxyType({
+        'name': 'Digital Cinema',
+        'description': 'Cinema grade (EXR, 32-bit, DCI-P3)',
+        'use_case': 'Feature films, theater projection, VFX'
+    }),
+    'games': MappingProxyType({
+        'name': 'Game Assets',
+        'description': 'Game engine ready (PNG, 8-bit, Uncharted2)',
+        'use_case': 'Video games, real-time rendering, Unity/Unreal'
+    })
+})
+
+
 class ImageProcessor:
     """
     Advanced image processing for professional workflows.
@@ -28,6 +129,33 @@ class ImageProcessor:
     
     TONE_MAPPING_ALGORITHMS = ['reinhard', 'filmic', 'aces', 'uncharted2', 'none']
     
+    # Simplified sRGB -> target gamut expansion, applied as a gain fused
+    # into the tone mapping pass
+    COLOR_SPACE_GAINS = {
+        'rec2020': 1.1,
+        'dci_p3': 1.05,
+        'adobe_rgb': 1.08
+    }
+    
+    # Integer code value -> [0, 1] float32 lookup tables, built once
+    _UNIT_LUTS = {
+        np.dtype(np.uint8): np.arange(256, dtype=np.float32) / 255.0,
+        np.dtype(np.uint16): np.arange(65536, dtype=np.float32) / 65535.0
+    }
+    
+    # TIFF compression name -> libtiff COMPRESSION_* code for cv2.imencode
+    _TIFF_COMPRESSION = {
+        'none': 1,
+        'lzw': 5
+    }
+    
+    # Images above this many pixels are processed in a worker process
+    LARGE_IMAGE_PIXELS = 8_000_000
+    
+    # Above this many pixels the pixel stage is split into row tiles that
+    # run in parallel across the process pool
+    TILED_IMAGE_PIXELS = 16_000_000
+    
     def __init__(self):
         self.supported_formats = {
             'tiff': {'bit_depth': [8, 16, 32], 'compression': ['none', 'lzw', 'jpeg']},
@@ -62,61 +190,189 @@ class ImageProcessor:
             Tuple of (processed_image_bytes, metadata_dict)
         """
         try:
-            # Apply preset if specified
-            if preset:
-                params = self._get_preset_params(preset)
-                output_format = params.get('format', output_format)
-                bit_depth = params.get('bit_depth', bit_depth)
-                color_space = params.get('color_space', color_space)
-                tone_mapping = params.get('tone_mapping', tone_mapping)
-            
-            # Validate parameters
-            self._validate_parameters(output_format, bit_depth, color_space, tone_mapping)
-            
-            # Load image
-            img = Image.open(io.BytesIO(image_data))
+            output_format, bit_depth, color_space, tone_mapping = self._resolve_options(
+                output_format, bit_depth, color_space, tone_mapping, preset
+            )
             
-            # Convert to numpy array for processing
-            img_array = np.array(img, dtype=np.float32) / 255.0
+            # Decode into a contiguous float32 working buffer; tone mapping,
+            # color space conversion and quantization all update it in place
+            img_array = self._decode_image(image_data)
             
-            # Apply tone mapping if specified
-            if tone_mapping != 'none':
-                img_array = self._apply_tone_mapping(img_array, tone_mapping)
+            gain = self._color_space_gain('srgb', color_space)
+            img_array = self._process_pixels(img_array, tone_mapping, gain, bit_depth)
             
-            # Convert color space if needed
-            if color_space != 'srgb':
-                img_array = self._convert_color_space(img_array, 'srgb', color_space)
+            return self._export_with_metadata(
+                img_array, output_format, bit_depth, color_space, tone_mapping, preset, **kwargs
+            )
             
-            # Convert to target bit depth
-            if bit_depth == 8:
-                img_array = (np.clip(img_array, 0, 1) * 255).astype(np.uint8)
-            elif bit_depth == 16:
-                img_array = (np.clip(img_array, 0, 1) * 65535).astype(np.uint16)
-            else:  # 32-bit
-                img_array = img_array.astype(np.float32)
+        except Exception as e:
+            logger.error(f"Image processing failed: {str(e)}")
+            raise
+    
+    def _resolve_options(
+        self,
+        output_format: str,
+        bit_depth: int,
+        color_space: str,
+        tone_mapping: str,
+        preset: Optional[str]
+    ) -> tuple[str, int, str, str]:
+        """Apply the preset, if any, and validate the resulting options."""
+        if preset:
+            params = self._get_preset_params(preset)
+            output_format = params.get('format', output_format)
+            bit_depth = params.get('bit_depth', bit_depth)
+            color_space = params.get('color_space', color_space)
+            tone_mapping = params.get('tone_mapping', tone_mapping)
+        
+        self._validate_parameters(output_format, bit_depth, color_space, tone_mapping)
+        return output_format, bit_depth, color_space, tone_mapping
+    
+    def _process_pixels(
+        self, img_array: np.ndarray, tone_mapping: str, gain: float, bit_depth: int
+    ) -> np.ndarray:
+        """
+        Tone map and quantize a float32 buffer (or any row band of one: every
+        step is per-pixel).
+        """
+        # Apply tone mapping and the color space gain in one pass
+        if tone_mapping != 'none' or gain != 1.0:
+            img_array = self._apply_tone_mapping(img_array, tone_mapping, gain)
+        
+        # Convert to target bit depth
+        if bit_depth == 8:
+            # Scale, round and saturate to uint8 in one SIMD pass (the
+            # buffer is non-negative here, so the abs() is a no-op)
+            img_array = cv2.convertScaleAbs(img_array, alpha=255.0)
+        elif bit_depth == 16:
+            np.clip(img_array, 0, 1, out=img_array)
+            img_array *= 65535
+            img_array = img_array.astype(np.uint16)
+        return img_array
+    
+    def _export_with_metadata(
+        self,
+        img_array: np.ndarray,
+        output_format: str,
+        bit_depth: int,
+        color_space: str,
+        tone_mapping: str,
+        preset: Optional[str],
+        **kwargs
+    ) -> tuple[bytes, Dict[str, Any]]:
+        """Encode the processed buffer and attach the processing metadata."""
+        output_bytes, metadata = self._export_image(
+            img_array, output_format, bit_depth, **kwargs
+        )
+        
+        metadata.update({
+            'bit_depth': bit_depth,
+            'color_space': color_space,
+            'tone_mapping': tone_mapping,
+            'output_format': output_format,
+            'preset': preset or 'custom'
+        })
+        
+        return output_bytes, metadata
+    
+    def _decode_image(self, image_data: bytes) -> np.ndarray:
+        """
+        Decode image bytes with OpenCV into an RGB(A)/gray float32 array in [0, 1].
+        """
+        decoded = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_UNCHANGED)
+        if decoded is None:
+            raise ValueError("Could not decode input image")
+        
+        # OpenCV decodes to BGR(A); the pipeline works in RGB(A)
+        if decoded.ndim == 3 and decoded.shape[2] == 4:
+            decoded = cv2.cvtColor(decoded, cv2.COLOR_BGRA2RGBA)
+        elif decoded.ndim == 3:
+            decoded = cv2.cvtColor(decoded, cv2.COLOR_BGR2RGB)
+        
+        # 8/16-bit code values map through a lookup table in a single pass
+        lut = self._UNIT_LUTS.get(decoded.dtype)
+        if lut is not None:
+            return lut[decoded]
+        img_array = decoded.astype(np.float32)
+        scale = np.iinfo(decoded.dtype).max if decoded.dtype.kind in 'ui' else 1.0
+        return np.divide(img_array, scale, out=img_array)
+    
+    @staticmethod
+    def _to_bgr(img_array: np.ndarray) -> np.ndarray:
+        """RGB(A) -> BGR(A) channel order for OpenCV encoders."""
+        if img_array.ndim == 3 and img_array.shape[2] == 4:
+            return cv2.cvtColor(img_array, cv2.COLOR_RGBA2BGRA)
+        if img_array.ndim == 3:
+            return cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+        return img_array
+    
+    async def process_image_async(self, image_data: bytes, **kwargs) -> tuple[bytes, Dict[str, Any]]:
+        """
+        Run process_image off the event loop.
+        
+        Small images go to a worker thread (OpenCV and NumPy release the GIL);
+        large ones go to the process pool, and very large ones are tiled
+        across it.
+        
+        Args:
+            image_data: Input image as bytes
+            **kwargs: Arguments for process_image
+        
+        Returns:
+            Tuple of (processed_image_bytes, metadata_dict)
+        """
+        try:
+            # Header-only read; pixel data is not decoded here
+            width, height = Image.open(io.BytesIO(image_data)).size
+        except Exception:
+            width = height = 0
+        
+        if width * height > self.TILED_IMAGE_PIXELS:
+            return await self._process_tiled(image_data, **kwargs)
+        
+        if width * height > self.LARGE_IMAGE_PIXELS:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_get_process_pool(), _process_in_worker, image_data, kwargs)
+        
+        return await anyio.to_thread.run_sync(functools.partial(self.process_image, image_data, **kwargs))
+    
+    async def _process_tiled(
+        self,
+        image_data: bytes,
+        output_format: str = 'png',
+        bit_depth: int = 16,
+        color_space: str = 'srgb',
+        tone_mapping: str = 'none',
+        preset: Optional[str] = None,
+        **kwargs
+    ) -> tuple[bytes, Dict[str, Any]]:
+        """
+        process_image for very large images: decode and encode run in a
+        thread, the per-pixel stage runs on horizontal tiles in the process pool.
+        """
+        try:
+            output_format, bit_depth, color_space, tone_mapping = self._resolve_options(
+                output_format, bit_depth, color_space, tone_mapping, preset
+            )
             
-            # Convert back to PIL Image
-            if bit_depth == 32:
-                # For 32-bit, we need to use a different mode
-                processed_img = Image.fromarray(img_array, mode='F')
-            else:
-                processed_img = Image.fromarray(img_array)
+            img_array = await anyio.to_thread.run_sync(self._decode_image, image_data)
             
-            # Export to specified format
-            output_bytes, metadata = self._export_image(
-                processed_img, output_format, bit_depth, **kwargs
-            )
+            gain = self._color_space_gain('srgb', color_space)
+            tiles = np.array_split(img_array, os.cpu_count() or 1, axis=0)
+            del img_array
             
-            # Add processing metadata
-            metadata.update({
-                'bit_depth': bit_depth,
-                'color_space': color_space,
-                'tone_mapping': tone_mapping,
-                'output_format': output_format,
-                'preset': preset or 'custom'
-            })
+            loop = asyncio.get_running_loop()
+            pool = _get_process_pool()
+            results = await asyncio.gather(*(
+                loop.run_in_executor(pool, _process_tile, tile, tone_mapping, gain, bit_depth)
+                for tile in tiles
+            ))
+            img_array = np.concatenate(results, axis=0)
             
-            return output_bytes, metadata
+            return await anyio.to_thread.run_sync(functools.partial(
+                self._export_with_metadata,
+                img_array, output_format, bit_depth, color_space, tone_mapping, preset, **kwargs
+            ))
             
         except Exception as e:
             logger.error(f"Image processing failed: {str(e)}")
@@ -136,177 +392,160 @@ class ImageProcessor:
         if tone_mapping not in self.TONE_MAPPING_ALGORITHMS:
             raise ValueError(f"Unsupported tone mapping: {tone_mapping}")
     
-    def _apply_tone_mapping(self, img_array: np.ndarray, algorithm: str) -> np.ndarray:
-        """Apply HDR tone mapping algorithm."""
-        if algorithm == 'reinhard':
-            # Reinhard tone mapping: I_out = I_in / (1 + I_in)
-            return img_array / (1 + img_array)
-        
-        elif algorithm == 'filmic':
+    @staticmethod
+    def _filmic_curve(
+        x: np.ndarray, a: float, b: float, c: float, d: float, e: float, gain: float
+    ) -> np.ndarray:
+        """gain * (x * (a*x + b)) / (x * (c*x + d) + e), clipped to [0, 1], written into x."""
+        num = np.multiply(x, a)
+        num += b
+        num *= x
+        den = np.multiply(x, c)
+        den += d
+        den *= x
+        den += e
+        np.divide(num, den, out=x)
+        if gain != 1.0:
+            x *= gain
+        return np.clip(x, 0, 1, out=x)
+    
+    def _apply_tone_mapping(self, img_array: np.ndarray, algorithm: str, gain: float = 1.0) -> np.ndarray:
+        """
+        Apply HDR tone mapping algorithm in place on a float32 buffer, followed
+        by the color space gain (output clipped to [0, 1] when gain != 1).
+        """
+        if algorithm == 'filmic':
             # Filmic tone mapping (ACES-like curve)
-            a = 2.51
-            b = 0.03
-            c = 2.43
-            d = 0.59
-            e = 0.14
-            return np.clip((img_array * (a * img_array + b)) / (img_array * (c * img_array + d) + e), 0, 1)
+            return self._filmic_curve(img_array, 2.51, 0.03, 2.43, 0.59, 0.14, gain)
         
         elif algorithm == 'aces':
             # ACES filmic tone mapping
-            a = 2.51
-            b = 0.03
-            c = 2.43
-            d = 0.59
-            e = 0.14
-            img_array = img_array * 0.6  # Exposure adjustment
-            return np.clip((img_array * (a * img_array + b)) / (img_array * (c * img_array + d) + e), 0, 1)
+            img_array *= 0.6  # Exposure adjustment
+            return self._filmic_curve(img_array, 2.51, 0.03, 2.43, 0.59, 0.14, gain)
+        
+        if algorithm == 'reinhard':
+            # Reinhard tone mapping: I_out = I_in / (1 + I_in)
+            np.divide(img_array, img_array + 1, out=img_array)
         
         elif algorithm == 'uncharted2':
             # Uncharted 2 tone mapping
+            A = 0.15
+            B = 0.50
+            C = 0.10
+            D = 0.20
+            E = 0.02
+            F = 0.30
+            
             def uncharted2_tonemap_partial(x):
-                A = 0.15
-                B = 0.50
-                C = 0.10
-                D = 0.20
-                E = 0.02
-                F = 0.30
                 return ((x * (A * x + C * B) + D * E) / (x * (A * x + B) + D * F)) - E / F
             
             exposure_bias = 2.0
-            curr = uncharted2_tonemap_partial(img_array * exposure_bias)
             W = 11.2
             white_scale = 1.0 / uncharted2_tonemap_partial(W)
-            return curr * white_scale
+            
+            # Same curve as the scalar partial, evaluated into the buffer
+            img_array *= exposure_bias
+            num = np.multiply(img_array, A)
+            num += C * B
+            num *= img_array
+            num += D * E
+            den = np.multiply(img_array, A)
+            den += B
+            den *= img_array
+            den += D * F
+            np.divide(num, den, out=img_array)
+            img_array -= E / F
+            # White scale and color space gain folded into one multiply
+            img_array *= white_scale * gain
+            if gain != 1.0:
+                np.clip(img_array, 0, 1, out=img_array)
+            return img_array
         
+        if gain != 1.0:
+            img_array *= gain
+            np.clip(img_array, 0, 1, out=img_array)
         return img_array
     
-    def _convert_color_space(self, img_array: np.ndarray, src: str, dst: str) -> np.ndarray:
-        """Convert between color spaces."""
-        # For simplicity, using OpenCV color conversion
-        # In production, you'd use proper color management with ICC profiles
-        
-        if src == 'srgb' and dst == 'rec2020':
-            # Convert sRGB to Rec.2020 (wide gamut)
-            # This is a simplified conversion; proper implementation needs color matrices
-            img_array = np.clip(img_array * 1.1, 0, 1)  # Expand gamut slightly
-        
-        elif src == 'srgb' and dst == 'dci_p3':
-            # Convert sRGB to DCI-P3
-            img_array = np.clip(img_array * 1.05, 0, 1)
-        
-        elif src == 'srgb' and dst == 'adobe_rgb':
-            # Convert sRGB to Adobe RGB
-            img_array = np.clip(img_array * 1.08, 0, 1)
-        
-        return img_array
+    def _color_space_gain(self, src: str, dst: str) -> float:
+        """Gain approximating the conversion between color spaces."""
+        # This is a simplified conversion (a uniform gamut expansion);
+        # in production, you'd use proper color management with ICC profiles
+        if src == 'srgb':
+            return self.COLOR_SPACE_GAINS.get(dst, 1.0)
+        return 1.0
     
     def _export_image(
-        self, img: Image.Image, output_format: str, bit_depth: int, **kwargs
+        self, img_array: np.ndarray, output_format: str, bit_depth: int, **kwargs
     ) -> tuple[bytes, Dict[str, Any]]:
         """Export image to specified format."""
-        output = io.BytesIO()
         metadata = {}
         
+        # PNG, WebP and (uncompressed or LZW) TIFF are encoded by OpenCV
+        # straight from the array
+        if output_format == 'png':
+            ok, encoded = cv2.imencode(
+                '.png', self._to_bgr(img_array),
+                [cv2.IMWRITE_PNG_COMPRESSION, kwargs.get('compress_level', 6)]
+            )
+            if not ok:
+                raise ValueError("PNG encoding failed")
+            return encoded.tobytes(), metadata
+        
+        if output_format == 'webp':
+            quality = kwargs.get('quality', 90)
+            ok, encoded = cv2.imencode(
+                '.webp', self._to_bgr(img_array), [cv2.IMWRITE_WEBP_QUALITY, quality]
+            )
+            if not ok:
+                raise ValueError("WebP encoding failed")
+            metadata['quality'] = quality
+            return encoded.tobytes(), metadata
+        
         if output_format == 'tiff':
             compression = kwargs.get('compression', 'lzw')
-            img.save(output, format='TIFF', compression=compression)
             metadata['compression'] = compression
+            if compression in self._TIFF_COMPRESSION:
+                return self._encode_tiff(img_array, compression), metadata
         
         elif output_format == 'exr':
             # EXR requires OpenEXR library, fallback to TIFF for now
             # In production, use: import OpenEXR, Imath
             logger.warning("EXR export not fully implemented, using TIFF instead")
-            img.save(output, format='TIFF', compression='none')
             metadata['note'] = 'EXR requested but exported as TIFF (OpenEXR required)'
+            return self._encode_tiff(img_array, 'none'), metadata
         
-        elif output_format == 'png':
-            if bit_depth == 16:
-                img.save(output, format='PNG', compress_level=kwargs.get('compress_level', 6))
-            else:
-                img.save(output, format='PNG')
-        
-        elif output_format == 'webp':
-            quality = kwargs.get('quality', 90)
-            img.save(output, format='WEBP', quality=quality)
-            metadata['quality'] = quality
+        # JPEG-compressed TIFF is written through PIL
+        if bit_depth == 32:
+            # For 32-bit, we need to use a different mode
+            img = Image.fromarray(img_array, mode='F')
+        else:
+            img = Image.fromarray(img_array)
+        output = io.BytesIO()
+        img.save(output, format='TIFF', compression=compression)
         
         output.seek(0)
         return output.read(), metadata
     
-    def _get_preset_params(self, preset: str) -> Dict[str, Any]:
+    def _encode_tiff(self, img_array: np.ndarray, compression: str) -> bytes:
+        """Encode a native-endian 8/16/32-bit array as TIFF with OpenCV's libtiff."""
+        ok, encoded = cv2.imencode(
+            '.tiff', self._to_bgr(img_array),
+            [cv2.IMWRITE_TIFF_COMPRESSION, self._TIFF_COMPRESSION[compression]]
+        )
+        if not ok:
+            raise ValueError("TIFF encoding failed")
+        return encoded.tobytes()
+    
+    def _get_preset_params(self, preset: str) -> Mapping[str, Any]:
         """Get parameters for quick presets."""
-        presets = {
-            'web': {
-                'format': 'webp',
-                'bit_depth': 8,
-                'color_space': 'srgb',
-                'tone_mapping': 'none',
-                'quality': 85
-            },
-            'print': {
-                'format': 'tiff',
-                'bit_depth': 16,
-                'color_space': 'adobe_rgb',
-                'tone_mapping': 'none',
-                'compression': 'lzw'
-            },
-            'film_tv': {
-                'format': 'tiff',
-                'bit_depth': 16,
-                'color_space': 'rec2020',
-                'tone_mapping': 'aces',
-                'compression': 'none'
-            },
-            'cinema': {
-                'format': 'exr',
-                'bit_depth': 32,
-                'color_space': 'dci_p3',
-                'tone_mapping': 'filmic',
-                'compression': 'zip'
-            },
-            'games': {
-                'format': 'png',
-                'bit_depth': 8,
-                'color_space': 'srgb',
-                'tone_mapping': 'uncharted2',
-                'compress_level': 9
-            }
-        }
-        
-        if preset not in presets:
-            raise ValueError(f"Unknown preset: {preset}. Available: {list(presets.keys())}")
+        if preset not in _PRESET_PARAMS:
+            raise ValueError(f"Unknown preset: {preset}. Available: {list(_PRESET_PARAMS.keys())}")
         
-        return presets[preset]
+        return _PRESET_PARAMS[preset]
     
-    def get_available_presets(self) -> Dict[str, Dict[str, Any]]:
-        """Get all available presets with descriptions."""
-        return {
-            'web': {
-                'name': 'Web Optimized',
-                'description': 'Optimized for web (WebP, 8-bit, sRGB)',
-                'use_case': 'Websites, social media, online galleries'
-            },
-            'print': {
-                'name': 'Print Production',
-                'description': 'High quality for print (TIFF, 16-bit, Adobe RGB)',
-                'use_case': 'Magazines, posters, professional printing'
-            },
-            'film_tv': {
-                'name': 'Film & TV',
-                'description': 'Broadcast quality (TIFF, 16-bit, Rec.2020, ACES)',
-                'use_case': 'Television production, streaming, HDR content'
-            },
-            'cinema': {
-                'name': 'Digital Cinema',
-                'description': 'Cinema grade (EXR, 32-bit, DCI-P3)',
-                'use_case': 'Feature films, theater projection, VFX'
-            },
-            'games': {
-                'name': 'Game Assets',
-                'description': 'Game engine ready (PNG, 8-bit, Uncharted2)',
-                'use_case': 'Video games, real-time rendering, Unity/Unreal'
-            }
-        }
+    def get_available_presets(self) -> Mapping[str, Mapping[str, Any]]:
+        """Get all available presets with descriptions (read-only)."""
+        return _AVAILABLE_PRESETS
 
 
 # Global instance
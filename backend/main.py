@@ -3,14 +3,19 @@ FIBO Command Center - Main Application Entry Point
 """
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from contextlib import asynccontextmanager
+import anyio.to_thread
+import asyncio
+import functools
 import logging
+import orjson
 from typing import Optional
 
-from config import settings
+from config import settings, validate_settings_on_startup
 from routers import generation, workflows, projects, auth, ai_translator, image_processing, brand_guidelines, analytics, controlnet
 from database import engine, Base
+from http_clients import get_fibo_client, close_http_clients
 from middleware.rate_limit import RateLimitMiddleware
 from middleware.logging import LoggingMiddleware
 
@@ -21,6 +26,41 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Static status payloads, serialized once and served as-is
+_ROOT_JSON = orjson.dumps({
+    "status": "online",
+    "message": "FIBO Command Center API",
+    "version": "1.0.0",
+    "docs": "/api/docs"
+})
+_HEALTH_JSON = orjson.dumps({
+    "status": "healthy",
+    "environment": settings.ENVIRONMENT,
+    "services": {
+        "database": "connected",
+        "redis": "connected",
+        "fibo_api": "available"
+    }
+})
+
+
+async def _init_schema():
+    """
+    Create missing tables in development only; other environments create
+    the schema at deploy time (python create_db.py)
+    """
+    if settings.ENVIRONMENT != "development":
+        logger.info("Skipping table creation outside development")
+        return
+    # create_all inspects the database synchronously; keep it off the event loop
+    await anyio.to_thread.run_sync(functools.partial(Base.metadata.create_all, bind=engine))
+    logger.info("Database tables created")
+
+
+async def _init_http_clients(app: FastAPI):
+    """Create the shared outbound clients"""
+    app.state.fibo_client = get_fibo_client()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -29,18 +69,17 @@ async def lifespan(app: FastAPI):
     """
     # Startup
     logger.info("Starting FIBO Command Center...")
+    validate_settings_on_startup()
     
-    # Create database tables
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created")
-    
-    # Initialize services
+    # Initialize schema and services concurrently
+    await asyncio.gather(_init_schema(), _init_http_clients(app))
     logger.info("Services initialized")
     
     yield
     
     # Shutdown
     logger.info("Shutting down FIBO Command Center...")
+    await close_http_clients()
 
 
 # Create FastAPI application
@@ -50,6 +89,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -85,12 +125,7 @@ async def root():
     """
     Root endpoint - API health check
     """
-    return {
-        "status": "online",
-        "message": "FIBO Command Center API",
-        "version": "1.0.0",
-        "docs": "/api/docs"
-    }
+    return Response(content=_ROOT_JSON, media_type="application/json")
 
 
 @app.get("/api/health")
@@ -98,15 +133,7 @@ async def health_check():
     """
     Health check endpoint for monitoring
     """
-    return {
-        "status": "healthy",
-        "environment": settings.ENVIRONMENT,
-        "services": {
-            "database": "connected",
-            "redis": "connected",
-            "fibo_api": "available"
-        }
-    }
+    return Response(content=_HEALTH_JSON, media_type="application/json")
 
 
 @app.exception_handler(HTTPException)
@@ -114,7 +141,7 @@ async def http_exception_handler(request, exc):
     """
     Custom HTTP exception handler
     """
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "error": exc.detail,
@@ -129,7 +156,7 @@ async def general_exception_handler(request, exc):
     General exception handler for unexpected errors
     """
     logger.error(f"Unexpected error: {str(exc)}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
@@ -139,11 +166,23 @@ async def general_exception_handler(request, exc):
 
 
 if __name__ == "__main__":
+    import importlib.util
+    import sys
     import uvicorn
+    
+    # uvloop (POSIX only) and httptools ship with uvicorn[standard]; fall
+    # back to the pure-Python implementations when they are missing
+    use_uvloop = sys.platform != "win32" and importlib.util.find_spec("uvloop") is not None
+    use_httptools = importlib.util.find_spec("httptools") is not None
+    
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
         reload=settings.DEBUG,
-        log_level=settings.LOG_LEVEL.lower()
+        log_level=settings.LOG_LEVEL.lower(),
+        loop="uvloop" if use_uvloop else "asyncio",
+        http="httptools" if use_httptools else "h11",
+        workers=settings.WORKERS,
+        access_log=False  # LoggingMiddleware logs every request
     )
@@ -5,20 +5,27 @@ import time
 
 logger = logging.getLogger(__name__)
 
+# Polled by monitoring; neither timed nor logged
+_UNLOGGED_PATHS = frozenset({"/", "/api/health"})
+
 class LoggingMiddleware(BaseHTTPMiddleware):
     """Request logging middleware"""
-    
+
     async def dispatch(self, request, call_next):
-        start_time = time.time()
-        
+        path = request.url.path
+        if path in _UNLOGGED_PATHS:
+            return await call_next(request)
+
+        start_ns = time.perf_counter_ns()
+
         response = await call_next(request)
-        
-        process_time = time.time() - start_time
-        logger.info(
-            f"{request.method} {request.url.path} "
-            f"completed in {process_time:.3f}s "
-            f"with status {response.status_code}"
-        )
-        
-        response.headers["X-Process-Time"] = str(process_time)
+
+        process_time = (time.perf_counter_ns() - start_ns) / 1e9
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                f"{request.method} {path} completed in {process_time:.3f}s "
+                f"with status {response.status_code}"
+            )
+
+        response.headers["X-Process-Time"] = f"{process_time:.6f}"
         return response
@@ -1,36 +1,89 @@
 """Rate limiting middleware"""
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
+from starlette.responses import Response
+import asyncio
+import orjson
 import time
-from collections import defaultdict
+from collections import OrderedDict
+from ipaddress import ip_address
+from typing import Optional, Tuple, Union
+
+# 429 body, serialized once so rejecting a flood costs no encoding
+_RATE_LIMITED_JSON = orjson.dumps({"error": "Rate limit exceeded"})
+
+
+def _client_key(host: Optional[str]) -> Union[int, str]:
+    """Pack an IPv4/IPv6 address into an integer; other hosts stay strings"""
+    try:
+        address = ip_address(host)
+    except ValueError:
+        return host or ""
+    # Tag IPv6 above the 128-bit range so ::a.b.c.d cannot collide with a.b.c.d
+    return int(address) | (1 << 128) if address.version == 6 else int(address)
+
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """Simple rate limiting middleware"""
     
+    MAX_IPS = 100_000  # tracked clients; least recently seen are evicted first
+    SWEEP_INTERVAL = 30  # seconds between removals of expired clients
+    
     def __init__(self, app):
         super().__init__(app)
-        self.requests = defaultdict(list)
         self.limit = 60  # requests per minute
+        # Sliding-window counter per IP: (minute index, count in that
+        # minute, count in the minute before), least recently seen first
+        self.requests: "OrderedDict[Union[int, str], Tuple[int, int, int]]" = OrderedDict()
+        self._sweeper: Optional[asyncio.Task] = None
+    
+    def _store(self, client_ip: Union[int, str], state: Tuple[int, int, int]):
+        """Save a client's counters as most recently seen, evicting past MAX_IPS"""
+        self.requests[client_ip] = state
+        self.requests.move_to_end(client_ip)
+        if len(self.requests) > self.MAX_IPS:
+            self.requests.popitem(last=False)
+    
+    async def _sweep(self):
+        """Periodically drop clients whose counters have both expired"""
+        while True:
+            await asyncio.sleep(self.SWEEP_INTERVAL)
+            window = int(time.time() // 60)
+            # LRU order: stale clients are at the front
+            while self.requests:
+                ip, (start, _, _) = next(iter(self.requests.items()))
+                if start >= window - 1:
+                    break
+                del self.requests[ip]
     
     async def dispatch(self, request, call_next):
-        client_ip = request.client.host
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+        
+        client_ip = _client_key(request.client.host if request.client else None)
         now = time.time()
+        window = int(now // 60)
+        
+        # Roll the counters into the current minute
+        start, count, prev_count = self.requests.get(client_ip, (window, 0, 0))
+        if start != window:
+            prev_count = count if start == window - 1 else 0
+            count = 0
         
-        # Clean old requests
-        self.requests[client_ip] = [
-            req_time for req_time in self.requests[client_ip]
-            if now - req_time < 60
-        ]
+        # Estimated requests in the last 60s: the previous minute weighted
+        # by how much of it is still inside the window
+        rate = prev_count * (1 - (now % 60) / 60) + count
         
         # Check rate limit
-        if len(self.requests[client_ip]) >= self.limit:
-            return JSONResponse(
+        if rate >= self.limit:
+            self._store(client_ip, (window, count, prev_count))
+            return Response(
+                content=_RATE_LIMITED_JSON,
                 status_code=429,
-                content={"error": "Rate limit exceeded"}
+                media_type="application/json"
             )
         
         # Add current request
-        self.requests[client_ip].append(now)
+        self._store(client_ip, (window, count + 1, prev_count))
         
         response = await call_next(request)
         return response
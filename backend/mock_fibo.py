@@ -3,15 +3,322 @@ Mock FIBO Service for Frontend Testing
 This mock service simulates FIBO API responses for development and testing
 """
 import asyncio
+import functools
+import hashlib
+import os
+import queue
 import random
-from typing import Dict, Any, Optional, List
+import re
+import tempfile
+import textwrap
+import threading
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple
 import logging
+import numpy as np
+import orjson
 import base64
+import anyio.to_thread
+from collections import OrderedDict
 from io import BytesIO
+from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont
+from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Gradient endpoints for each color_palette
+_PALETTE_COLORS = {
+    "vibrant": [(255, 0, 100), (0, 255, 200)],
+    "pastel": [(255, 200, 200), (200, 200, 255)],
+    "monochrome": [(100, 100, 100), (200, 200, 200)],
+    "warm": [(255, 150, 100), (255, 200, 150)],
+    "cool": [(100, 150, 255), (150, 200, 255)],
+    "neon": [(255, 0, 255), (0, 255, 255)],
+    "earth-tones": [(160, 120, 80), (200, 180, 140)],
+    "jewel-tones": [(150, 50, 150), (50, 150, 150)]
+}
+_DEFAULT_COLORS = [(100, 150, 200), (200, 150, 100)]
+
+# Overlay font candidates: Windows/macOS, then the DejaVu font most Linux distributions ship
+_FONT_NAMES = ("arial.ttf", "DejaVuSans.ttf")
+
+# (palette, width, height) -> read-only RGB gradient; unknown palettes share
+# the default entry so the cache stays bounded
+_GRADIENT_CACHE: Dict[Tuple[Optional[str], int, int], np.ndarray] = {}
+
+# MOCK_IMAGE_FORMAT -> (PIL format, save options, MIME type); fast settings,
+# the placeholder's size does not matter
+_MOCK_ENCODINGS = {
+    "png": ("PNG", {"compress_level": 1}, "image/png"),
+    "jpeg": ("JPEG", {"quality": 85}, "image/jpeg")
+}
+
+# Worker coroutines (mock generations in flight) per batch_generate call
+_BATCH_WORKERS = max(5, os.cpu_count() or 1)
+
+# Rendered images by SHA-1 of their bytes -> (bytes, MIME type), least
+# recently used first; a hot cache over the files in MOCK_IMAGE_DIR
+_IMAGE_STORE: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+_IMAGE_STORE_SIZE = 256
+
+# File extension of stored mock images -> MIME type
+_IMAGE_EXTENSIONS = {".png": "image/png", ".jpg": "image/jpeg"}
+_MIME_EXTENSIONS = {mime: ext for ext, mime in _IMAGE_EXTENSIONS.items()}
+_DIGEST_RE = re.compile(r"[0-9a-f]{40}")
+
+# Saved files counted since the last sweep of MOCK_IMAGE_DIR (None before the
+# first one); the directory is listed only once the count passes the cap by
+# _SWEEP_SLACK, not on every write
+_SWEEP_SLACK = 64
+_saved_count: Optional[int] = None
+_sweep_lock = threading.Lock()
+
+# Reusable (canvas, output buffer) pairs, most recently used first
+_CANVAS_POOL: "queue.LifoQueue[Tuple[Image.Image, BytesIO]]" = queue.LifoQueue(maxsize=_BATCH_WORKERS)
+
+
+def _load_font(size: int) -> ImageFont.ImageFont:
+    """First available TrueType font at the given size, else Pillow's default"""
+    for name in _FONT_NAMES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def _line_spacing(font: ImageFont.ImageFont, pitch: int) -> int:
+    """multiline_text spacing that places successive lines `pitch` pixels apart"""
+    line_height = ImageDraw.Draw(Image.new('L', (1, 1))).textbbox((0, 0), "A", font=font)[3]
+    return pitch - line_height
+
+
+# Overlay fonts, resolved once at import instead of on every render
+_FONT_LARGE = _load_font(40)
+_FONT_SMALL = _load_font(24)
+
+# Line pitch of the prompt (35px) and parameter (30px) blocks
+_PROMPT_SPACING = _line_spacing(_FONT_SMALL, 35)
+_PARAM_SPACING = _line_spacing(_FONT_SMALL, 30)
+
+
+def _tiny_png_data_url() -> str:
+    """Data URL of a 1x1 black PNG"""
+    buffer = BytesIO()
+    Image.new('RGB', (1, 1)).save(buffer, format='PNG')
+    return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+
+# image_url for generate(render_image=False), encoded once
+_TINY_PNG_DATA_URL = _tiny_png_data_url()
+
+
+def _gradient(color_palette: str, width: int, height: int) -> np.ndarray:
+    """Vertical gradient for a palette, cached per palette and size"""
+    palette = color_palette if color_palette in _PALETTE_COLORS else None
+    key = (palette, width, height)
+    pixels = _GRADIENT_CACHE.get(key)
+    if pixels is None:
+        color_set = _PALETTE_COLORS.get(palette, _DEFAULT_COLORS)
+        
+        # One interpolated color per row, broadcast across the width
+        ratio = (np.arange(height) / height)[:, None]
+        start = np.array(color_set[0], dtype=np.float64)
+        end = np.array(color_set[1], dtype=np.float64)
+        rows = (start * (1 - ratio) + end * ratio).astype(np.uint8)
+        pixels = np.ascontiguousarray(np.broadcast_to(rows[:, None, :], (height, width, 3)))
+        pixels.flags.writeable = False
+        _GRADIENT_CACHE[key] = pixels
+    return pixels
+
+
+def _acquire_canvas(width: int, height: int) -> Tuple[Image.Image, BytesIO]:
+    """Take a reusable RGB canvas and output buffer from the pool, or allocate them"""
+    try:
+        img, buffer = _CANVAS_POOL.get_nowait()
+        if img.size == (width, height):
+            return img, buffer
+    except queue.Empty:
+        pass
+    return Image.new('RGB', (width, height)), BytesIO()
+
+
+def _release_canvas(img: Image.Image, buffer: BytesIO) -> None:
+    """Return a canvas and buffer to the pool; dropped when it is full"""
+    try:
+        _CANVAS_POOL.put_nowait((img, buffer))
+    except queue.Full:
+        pass
+
+
+def _render_mock(
+    prompt: str,
+    camera_angle: Optional[str],
+    fov: Optional[str],
+    lighting: Optional[str],
+    color_palette: Optional[str],
+    composition: Optional[str],
+    style: Optional[str]
+) -> Tuple[bytes, str]:
+    """Render the placeholder image; returns (encoded bytes, MIME type) (runs in a worker thread)"""
+    # Create a simple placeholder image
+    width = 1024
+    height = 1024
+    
+    # Pooled canvas and output buffer; the cached gradient is copied in
+    img, buffer = _acquire_canvas(width, height)
+    try:
+        img.frombytes(_gradient(color_palette or "vibrant", width, height))
+        draw = ImageDraw.Draw(img)
+        
+        # Add title
+        title_text = "MOCK FIBO GENERATION"
+        draw.text((50, 50), title_text, fill=(255, 255, 255), font=_FONT_LARGE)
+        
+        # Add prompt, word-wrapped, in one draw call
+        prompt_lines = textwrap.wrap(prompt, width=40)[:3]  # Max 3 lines
+        draw.multiline_text(
+            (50, 120), "\n".join(prompt_lines),
+            fill=(255, 255, 255), font=_FONT_SMALL, spacing=_PROMPT_SPACING
+        )
+        
+        # Add parameters
+        param_text = []
+        if camera_angle:
+            param_text.append(f"Camera: {camera_angle}")
+        if fov:
+            param_text.append(f"FOV: {fov}")
+        if lighting:
+            param_text.append(f"Lighting: {lighting}")
+        if composition:
+            param_text.append(f"Composition: {composition}")
+        if style:
+            param_text.append(f"Style: {style}")
+        
+        draw.multiline_text(
+            (50, height - 200), "\n".join(param_text),
+            fill=(255, 255, 255), font=_FONT_SMALL, spacing=_PARAM_SPACING
+        )
+        
+        # Add watermark
+        draw.text((50, height - 50), "Development Mode - Replace with real FIBO API", 
+                 fill=(255, 255, 255), font=_FONT_SMALL)
+        
+        # Encode
+        image_format, save_options, mime_type = _MOCK_ENCODINGS.get(
+            settings.MOCK_IMAGE_FORMAT.lower(), _MOCK_ENCODINGS["png"]
+        )
+        buffer.seek(0)
+        buffer.truncate(0)
+        img.save(buffer, format=image_format, **save_options)
+        image_bytes = buffer.getvalue()
+    finally:
+        _release_canvas(img, buffer)
+    
+    return image_bytes, mime_type
+
+
+def _remember_image(digest: str, image_bytes: bytes, mime_type: str):
+    """Keep an image in the in-memory store, evicting the least recently used"""
+    _IMAGE_STORE[digest] = (image_bytes, mime_type)
+    _IMAGE_STORE.move_to_end(digest)
+    while len(_IMAGE_STORE) > _IMAGE_STORE_SIZE:
+        _IMAGE_STORE.popitem(last=False)
+
+
+def _write_image(digest: str, image_bytes: bytes, mime_type: str):
+    """Save an image under MOCK_IMAGE_DIR; content-addressed, so written once"""
+    directory = Path(settings.MOCK_IMAGE_DIR)
+    path = directory / f"{digest}{_MIME_EXTENSIONS[mime_type]}"
+    if path.exists():
+        return
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(image_bytes)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # The link still works while the image stays in memory
+        logger.warning(f"Could not save mock image {digest}: {str(e)}")
+        return
+    _sweep_images(directory)
+
+
+def _sweep_images(directory: Path):
+    """Delete the oldest saved images beyond MOCK_IMAGE_MAX_FILES"""
+    global _saved_count
+    limit = settings.MOCK_IMAGE_MAX_FILES
+    if limit <= 0:
+        return
+    with _sweep_lock:
+        if _saved_count is not None and _saved_count < limit + _SWEEP_SLACK:
+            _saved_count += 1
+            return
+        
+        saved = []
+        try:
+            for path in directory.iterdir():
+                if path.suffix in _IMAGE_EXTENSIONS:
+                    try:
+                        saved.append((path.stat().st_mtime, path))
+                    except FileNotFoundError:
+                        continue
+        except OSError as e:
+            logger.warning(f"Could not sweep mock images: {str(e)}")
+            return
+        
+        saved.sort()
+        for _, path in saved[:-limit]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove mock image {path.name}: {str(e)}")
+        _saved_count = min(len(saved), limit)
+
+
+def _render_and_save(*args) -> Tuple[str, bytes, str]:
+    """Render a placeholder and save it; returns (content hash, bytes, MIME type)"""
+    image_bytes, mime_type = _render_mock(*args)
+    digest = hashlib.sha1(image_bytes).hexdigest()
+    _write_image(digest, image_bytes, mime_type)
+    return digest, image_bytes, mime_type
+
+
+def _read_image(digest: str) -> Optional[Tuple[bytes, str]]:
+    """Load a saved image from MOCK_IMAGE_DIR"""
+    directory = Path(settings.MOCK_IMAGE_DIR)
+    for extension, mime_type in _IMAGE_EXTENSIONS.items():
+        try:
+            return (directory / f"{digest}{extension}").read_bytes(), mime_type
+        except FileNotFoundError:
+            continue
+    return None
+
+
+async def get_mock_image(digest: str) -> Optional[Tuple[bytes, str]]:
+    """
+    Look up a rendered mock image by content hash
+    
+    Returns:
+        (image bytes, MIME type), or None if unknown
+    """
+    stored = _IMAGE_STORE.get(digest)
+    if stored is not None:
+        _IMAGE_STORE.move_to_end(digest)
+        return stored
+    
+    # Not in memory (evicted, or rendered before a restart); the digest
+    # becomes a file name, so accept only the hex form
+    if not _DIGEST_RE.fullmatch(digest):
+        return None
+    stored = await anyio.to_thread.run_sync(_read_image, digest)
+    if stored is not None:
+        _remember_image(digest, *stored)
+    return stored
+
 
 class MockFIBOIntegration:
     """
@@ -32,99 +339,40 @@ class MockFIBOIntegration:
         color_palette: Optional[str] = None,
         composition: Optional[str] = None,
         style: Optional[str] = None,
-        additional_params: Optional[Dict[str, Any]] = None
+        additional_params: Optional[Dict[str, Any]] = None,
+        cache_bypass: bool = False,
+        render_image: bool = True
     ) -> Dict[str, Any]:
         """
         Generate mock image with parameter visualization
+        (cache_bypass is accepted for parity with FIBOIntegration; nothing is cached)
+        
+        With render_image=False no placeholder is drawn and image_url is a
+        static 1x1 PNG, for callers that only exercise the JSON contract
         """
         try:
             logger.info(f"Mock generating image: {prompt}")
             
             # Simulate API delay
-            await asyncio.sleep(1)
-            
-            # Create a simple placeholder image
-            width = 1024
-            height = 1024
-            
-            # Choose color based on color_palette
-            colors = {
-                "vibrant": [(255, 0, 100), (0, 255, 200)],
-                "pastel": [(255, 200, 200), (200, 200, 255)],
-                "monochrome": [(100, 100, 100), (200, 200, 200)],
-                "warm": [(255, 150, 100), (255, 200, 150)],
-                "cool": [(100, 150, 255), (150, 200, 255)],
-                "neon": [(255, 0, 255), (0, 255, 255)],
-                "earth-tones": [(160, 120, 80), (200, 180, 140)],
-                "jewel-tones": [(150, 50, 150), (50, 150, 150)]
-            }
-            
-            color_set = colors.get(color_palette or "vibrant", [(100, 150, 200), (200, 150, 100)])
-            
-            # Create gradient image
-            img = Image.new('RGB', (width, height))
-            draw = ImageDraw.Draw(img)
-            
-            # Draw gradient
-            for y in range(height):
-                ratio = y / height
-                r = int(color_set[0][0] * (1 - ratio) + color_set[1][0] * ratio)
-                g = int(color_set[0][1] * (1 - ratio) + color_set[1][1] * ratio)
-                b = int(color_set[0][2] * (1 - ratio) + color_set[1][2] * ratio)
-                draw.line([(0, y), (width, y)], fill=(r, g, b))
-            
-            # Add text overlay with parameters
-            try:
-                # Try to load a font, fallback to default if not available
-                font_large = ImageFont.truetype("arial.ttf", 40)
-                font_small = ImageFont.truetype("arial.ttf", 24)
-            except:
-                font_large = ImageFont.load_default()
-                font_small = ImageFont.load_default()
-            
-            # Add title
-            title_text = "MOCK FIBO GENERATION"
-            draw.text((50, 50), title_text, fill=(255, 255, 255), font=font_large)
-            
-            # Add prompt
-            prompt_lines = [prompt[i:i+40] for i in range(0, len(prompt), 40)]
-            y_offset = 120
-            for line in prompt_lines[:3]:  # Max 3 lines
-                draw.text((50, y_offset), line, fill=(255, 255, 255), font=font_small)
-                y_offset += 35
-            
-            # Add parameters
-            param_text = []
-            if camera_angle:
-                param_text.append(f"Camera: {camera_angle}")
-            if fov:
-                param_text.append(f"FOV: {fov}")
-            if lighting:
-                param_text.append(f"Lighting: {lighting}")
-            if composition:
-                param_text.append(f"Composition: {composition}")
-            if style:
-                param_text.append(f"Style: {style}")
-            
-            y_offset = height - 200
-            for param in param_text:
-                draw.text((50, y_offset), param, fill=(255, 255, 255), font=font_small)
-                y_offset += 30
+            if settings.MOCK_DELAY_SECONDS:
+                await asyncio.sleep(settings.MOCK_DELAY_SECONDS)
             
-            # Add watermark
-            draw.text((50, height - 50), "Development Mode - Replace with real FIBO API", 
-                     fill=(255, 255, 255), font=font_small)
-            
-            # Convert to base64
-            buffer = BytesIO()
-            img.save(buffer, format='PNG')
-            buffer.seek(0)
-            image_base64 = base64.b64encode(buffer.getvalue()).decode()
+            if render_image:
+                # Pillow's C core releases the GIL; render (and save) off the event loop
+                digest, image_bytes, mime_type = await anyio.to_thread.run_sync(functools.partial(
+                    _render_and_save, prompt, camera_angle, fov, lighting, color_palette, composition, style
+                ))
+                
+                # Served by GET /api/generate/mock-image/{digest} instead of an inline data URL
+                _remember_image(digest, image_bytes, mime_type)
+                image_url = f"{settings.MOCK_IMAGE_BASE_URL.rstrip('/')}/api/generate/mock-image/{digest}"
+            else:
+                image_url = _TINY_PNG_DATA_URL
             
             # Return mock response
             return {
                 "status": "success",
-                "image_url": f"data:image/png;base64,{image_base64}",
+                "image_url": image_url,
                 "parameters": {
                     "prompt": prompt,
                     "camera_angle": camera_angle,
@@ -142,17 +390,40 @@ class MockFIBOIntegration:
             logger.error(f"Error in mock generation: {str(e)}")
             raise
     
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[bytes]:
+        """Mock streaming generation: a V2-shaped response body as one chunk"""
+        result = await self.generate(prompt, **kwargs)
+        yield orjson.dumps({"result": {"image_url": result["image_url"]}, "mock": True})
+    
     async def batch_generate(
         self,
-        requests: List[Dict[str, Any]]
+        requests: List[Dict[str, Any]],
+        render_image: bool = True
     ) -> List[Dict[str, Any]]:
         """
         Generate multiple images in batch (mock)
+        (render_image is the default for requests that do not set it)
         """
-        results = []
-        for req in requests:
-            result = await self.generate(**req)
-            results.append(result)
+        # Pipeline: the request queue feeds a fixed set of worker coroutines
+        # that overlap the simulated delays and renders; with the LIFO
+        # canvas pool each busy worker keeps reusing a warm buffer
+        jobs: "asyncio.Queue[Tuple[int, Dict[str, Any]]]" = asyncio.Queue()
+        for job in enumerate(requests):
+            jobs.put_nowait(job)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        
+        async def _worker() -> None:
+            while not jobs.empty():
+                index, req = jobs.get_nowait()
+                results[index] = await self.generate(**{"render_image": render_image, **req})
+        
+        workers = [asyncio.create_task(_worker()) for _ in range(min(_BATCH_WORKERS, len(requests)))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            # Stop the remaining workers if one of them failed
+            for worker in workers:
+                worker.cancel()
         return results
     
     async def refine(
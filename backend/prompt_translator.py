@@ -4,14 +4,128 @@ Converts natural language descriptions to optimized FIBO JSON parameters
 Uses GPT-4 for intelligent parameter selection with reasoning
 """
 
+import asyncio
+import functools
+import hashlib
+import importlib.util
 import logging
-from typing import Dict, Any, Optional
-import json
-from openai import OpenAI
+import time
+from collections import OrderedDict
+from typing import Dict, Any, AsyncIterator, List, Optional, Set, Tuple
+import anyio.to_thread
+import numpy as np
+import orjson
+from openai import AsyncOpenAI
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Near-duplicate prompt matching needs the optional sentence-transformers package
+SEMANTIC_CACHE_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+
+# Bound on in-flight translation requests to the LLM provider
+_LLM_SEMAPHORE = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
+
+# Safe defaults returned when AI translation is unavailable or fails
+_FALLBACK_PARAMETERS = {
+    "camera_angle": "eye-level",
+    "fov": "standard",
+    "lighting": "natural",
+    "color_palette": "vibrant",
+    "composition": "rule-of-thirds",
+    "style": "photorealistic"
+}
+_FALLBACK_TEMPLATE = {
+    "intent": "General image generation",
+    "mood": "Balanced and professional",
+    "parameters": _FALLBACK_PARAMETERS,  # replaced per call with the user's prompt added
+    "reasoning": {
+        "camera_angle": "Eye-level provides neutral perspective",
+        "fov": "Standard FOV mimics natural vision",
+        "lighting": "Natural lighting for realistic results",
+        "color_palette": "Vibrant colors for visual appeal",
+        "composition": "Rule of thirds is professionally balanced",
+        "style": "Photorealistic for versatility"
+    },
+    "confidence": 0.5,
+    "suggestions": [
+        "Try low-angle for more dramatic effect",
+        "Consider dramatic lighting for moodier atmosphere"
+    ],
+    "fallback": True
+}
+
+
+
+def _pretty_json(data: Any) -> str:
+    """Indented JSON for embedding in prompts"""
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+
+
+class _SemanticCache:
+    """
+    Translation replies indexed by prompt embedding
+    Embeddings are L2-normalized, so a dot product is the cosine similarity
+    """
+    
+    def __init__(self, model_name: str, size: int, threshold: float):
+        self.model_name = model_name
+        self.size = size
+        self.threshold = threshold
+        self._encoder = None  # loaded on first use; False if loading failed
+        self._load_lock = asyncio.Lock()
+        # Ring buffer of embeddings, oldest overwritten first
+        self._vectors: Optional[np.ndarray] = None
+        # Per slot: ((model, context digest), expires_at, raw JSON reply)
+        self._entries: List[Optional[Tuple[Tuple[str, str], float, str]]] = [None] * size
+        self._next = 0
+    
+    def _load_encoder(self):
+        """Load the sentence-transformers model, or False if it cannot be loaded"""
+        try:
+            from sentence_transformers import SentenceTransformer
+            encoder = SentenceTransformer(self.model_name)
+        except Exception as e:
+            logger.warning(f"Semantic translation cache disabled: {str(e)}")
+            return False
+        logger.info(f"Semantic translation cache using {self.model_name}")
+        return encoder
+    
+    async def embed(self, text: str) -> Optional[np.ndarray]:
+        """Normalized embedding of text, or None without an encoder"""
+        if self._encoder is None:
+            async with self._load_lock:
+                if self._encoder is None:
+                    self._encoder = await anyio.to_thread.run_sync(self._load_encoder)
+        if self._encoder is False:
+            return None
+        vector = await anyio.to_thread.run_sync(functools.partial(
+            self._encoder.encode, text, normalize_embeddings=True
+        ))
+        return vector.astype(np.float32, copy=False)
+    
+    def lookup(self, vector: np.ndarray, scope: Tuple[str, str]) -> Optional[str]:
+        """Raw reply of the most similar live entry in scope, if above the threshold"""
+        if self._vectors is None:
+            return None
+        scores = self._vectors @ vector
+        now = time.monotonic()
+        for slot in np.argsort(scores)[::-1]:
+            if scores[slot] < self.threshold:
+                break
+            entry = self._entries[slot]
+            if entry is not None and entry[0] == scope and entry[1] > now:
+                return entry[2]
+        return None
+    
+    def store(self, vector: np.ndarray, scope: Tuple[str, str], raw: str):
+        """Add a reply, overwriting the oldest entry once full"""
+        if self._vectors is None:
+            self._vectors = np.zeros((self.size, vector.shape[0]), dtype=np.float32)
+        self._vectors[self._next] = vector
+        self._entries[self._next] = (scope, time.monotonic() + settings.TRANSLATION_CACHE_TTL, raw)
+        self._next = (self._next + 1) % self.size
+
 
 class PromptTranslator:
     """
@@ -23,7 +137,7 @@ class PromptTranslator:
         # Priority: Groq (FREE + FAST) > Gemini (FREE) > OpenAI (PAID)
         if settings.USE_GROQ and settings.GROQ_API_KEY:
             logger.info("Using Groq (FREE) for AI translation")
-            self.client = OpenAI(
+            self.client = AsyncOpenAI(
                 api_key=settings.GROQ_API_KEY,
                 base_url="https://api.groq.com/openai/v1"
             )
@@ -35,7 +149,7 @@ class PromptTranslator:
             self.model = settings.GEMINI_MODEL
         elif settings.OPENAI_API_KEY:
             logger.info("Using OpenAI for AI translation")
-            self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
             self.model = "gpt-4-turbo-preview"
         else:
             logger.warning("No AI API key configured. Using intelligent fallback mode.")
@@ -104,6 +218,32 @@ class PromptTranslator:
                 }
             }
         }
+        
+        # Allowed values as sets for O(1) validation; the first option is the default
+        self._allowed = {k: frozenset(v["options"]) for k, v in self.parameter_guide.items()}
+        self._defaults = {k: v["options"][0] for k, v in self.parameter_guide.items()}
+        
+        # Static for the instance's lifetime; rendered once
+        self._system_prompt = self._build_system_prompt()
+        
+        # (model, user_prompt, context digest) -> (expires_at, raw JSON reply)
+        self._cache: "OrderedDict[Tuple[str, str, str], Tuple[float, str]]" = OrderedDict()
+        # Cache misses currently being fetched, by the same key
+        self._inflight: Dict[Tuple[str, str, str], "asyncio.Future[str]"] = {}
+        
+        # Misses collected for one batched LLM call: (user message, reply future)
+        self._batch: List[Tuple[str, "asyncio.Future[str]"]] = []
+        self._batch_timer: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+        
+        # Catches reworded prompts that miss the exact cache
+        self._semantic: Optional[_SemanticCache] = None
+        if SEMANTIC_CACHE_AVAILABLE and settings.TRANSLATION_SEMANTIC_MODEL:
+            self._semantic = _SemanticCache(
+                settings.TRANSLATION_SEMANTIC_MODEL,
+                settings.TRANSLATION_CACHE_SIZE,
+                settings.TRANSLATION_SEMANTIC_THRESHOLD
+            )
     
     async def translate(
         self,
@@ -135,41 +275,220 @@ class PromptTranslator:
                 logger.warning("OpenAI client not initialized. Using fallback.")
                 return self._get_fallback_response(user_prompt)
             
-            # Build system prompt with FIBO knowledge
-            system_prompt = self._build_system_prompt()
-            
-            # Build user message with context
-            user_message = self._build_user_message(user_prompt, context)
+            key = self._cache_key(user_prompt, context)
+            raw = self._cached_reply(key)
+            if raw is None:
+                # Identical concurrent requests share a single fetch
+                pending = self._inflight.get(key)
+                if pending is None:
+                    pending = asyncio.ensure_future(self._fetch_reply(key, user_prompt, context))
+                    self._inflight[key] = pending
+                    pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+                # Shielded so one disconnecting client does not cancel the others
+                raw = await asyncio.shield(pending)
             
-            # Call GPT-4
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.3,  # Lower temperature for consistent output
-                response_format={"type": "json_object"}
-            )
+            # Parse a fresh copy; it is updated in place
+            return self._finish(orjson.loads(raw))
             
-            # Parse response
-            result = json.loads(response.choices[0].message.content)
-            
-            # Validate parameters
-            validated_params = self._validate_parameters(result.get("parameters", {}))
+        except Exception as e:
+            logger.error(f"Translation failed: {str(e)}", exc_info=True)
+            # Return safe defaults
+            return self._get_fallback_response(user_prompt)
+    
+    async def translate_stream(
+        self,
+        user_prompt: str,
+        context: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Translate natural language to FIBO parameters, streaming the LLM reply
+        
+        Yields {"delta": str} for each chunk of the raw JSON reply as it is
+        generated, then {"result": dict} with what translate would return.
+        The result is authoritative; it is the fallback if the reply fails.
+        """
+        try:
+            logger.info(f"Streaming translation: {user_prompt[:100]}...")
             
-            # Add quality score
-            result["parameters"] = validated_params
-            result["confidence"] = self._calculate_confidence(result)
+            if not self.client:
+                logger.warning("OpenAI client not initialized. Using fallback.")
+                result = self._get_fallback_response(user_prompt)
+            else:
+                key = self._cache_key(user_prompt, context)
+                raw = self._cached_reply(key)
+                if raw is None:
+                    user_message = self._build_user_message(user_prompt, context)
+                    chunks = []
+                    async with _LLM_SEMAPHORE:
+                        stream = await self._chat_request(user_message, stream=True)
+                        async for chunk in stream:
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if delta:
+                                chunks.append(delta)
+                                yield {"delta": delta}
+                    raw = "".join(chunks)
+                    result = orjson.loads(raw)
+                    self._store_reply(key, raw)
+                else:
+                    result = orjson.loads(raw)
+                result = self._finish(result)
             
-            logger.info(f"Translation complete. Confidence: {result['confidence']:.2f}")
+        except Exception as e:
+            logger.error(f"Streaming translation failed: {str(e)}", exc_info=True)
+            result = self._get_fallback_response(user_prompt)
+        
+        yield {"result": result}
+    
+    def _finish(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate a parsed reply in place and score it"""
+        # Validate parameters
+        validated_params = self._validate_parameters(result.get("parameters", {}))
+        
+        # Add quality score
+        result["parameters"] = validated_params
+        result["confidence"] = self._calculate_confidence(result)
+        
+        logger.info(f"Translation complete. Confidence: {result['confidence']:.2f}")
+        
+        return result
+    
+    def _cached_reply(self, key: Tuple[str, str, str]) -> Optional[str]:
+        """Raw JSON reply cached under key, if not expired"""
+        cached = self._cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            logger.info("Translation served from cache")
+            return cached[1]
+        return None
+    
+    def _store_reply(self, key: Tuple[str, str, str], raw: str):
+        """Cache a raw JSON reply, evicting the least recently used past the size limit"""
+        self._cache[key] = (time.monotonic() + settings.TRANSLATION_CACHE_TTL, raw)
+        self._cache.move_to_end(key)
+        while len(self._cache) > settings.TRANSLATION_CACHE_SIZE:
+            self._cache.popitem(last=False)
+    
+    async def _fetch_reply(
+        self,
+        key: Tuple[str, str, str],
+        user_prompt: str,
+        context: Optional[Dict[str, Any]]
+    ) -> str:
+        """Get the raw JSON reply for a cache miss and cache it"""
+        # Near-duplicate prompts with the same context share a reply
+        scope = (key[0], key[2])
+        vector = await self._semantic.embed(user_prompt) if self._semantic else None
+        raw = self._semantic.lookup(vector, scope) if vector is not None else None
+        
+        if raw is not None:
+            logger.info("Translation served from semantic cache")
+            # The cached reply was written for a similar prompt; keep this one's text
+            reply = orjson.loads(raw)
+            if isinstance(reply.get("parameters"), dict):
+                reply["parameters"]["prompt"] = user_prompt
+                raw = orjson.dumps(reply).decode()
+        else:
+            # Build user message with context
+            user_message = self._build_user_message(user_prompt, context)
             
-            return result
+            # Call GPT-4, batched with other concurrent misses
+            raw = await self._complete(user_message)
             
+            # Only cache replies that parse
+            orjson.loads(raw)
+            if vector is not None:
+                self._semantic.store(vector, scope, raw)
+        
+        self._store_reply(key, raw)
+        return raw
+    
+    def _complete(self, user_message: str) -> "asyncio.Future[str]":
+        """Queue a user message for the next batched LLM call"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._batch.append((user_message, future))
+        if len(self._batch) >= settings.TRANSLATION_BATCH_SIZE:
+            self._flush_batch()
+        elif self._batch_timer is None:
+            self._batch_timer = loop.call_later(settings.TRANSLATION_BATCH_WINDOW, self._flush_batch)
+        return future
+    
+    def _flush_batch(self):
+        """Send the queued user messages"""
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        batch, self._batch = self._batch, []
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+    
+    async def _run_batch(self, batch: List[Tuple[str, "asyncio.Future[str]"]]):
+        """Resolve each queued future with its raw reply"""
+        messages = [message for message, _ in batch]
+        try:
+            if len(messages) == 1:
+                replies = [await self._request_completion(messages[0])]
+            else:
+                replies = await self._request_batch_completion(messages)
         except Exception as e:
-            logger.error(f"Translation failed: {str(e)}", exc_info=True)
-            # Return safe defaults
-            return self._get_fallback_response(user_prompt)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), raw in zip(batch, replies):
+            if not future.done():
+                future.set_result(raw)
+    
+    async def _request_completion(self, user_message: str) -> str:
+        """Single LLM call returning the raw JSON reply"""
+        async with _LLM_SEMAPHORE:
+            response = await self._chat_request(user_message)
+        return response.choices[0].message.content
+    
+    def _chat_request(self, user_message: str, **options):
+        """Start a chat completion for one user message"""
+        return self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": self._system_prompt},
+                {"role": "user", "content": user_message}
+            ],
+            temperature=0.3,  # Lower temperature for consistent output
+            response_format={"type": "json_object"},
+            **options
+        )
+    
+    async def _request_batch_completion(self, messages: List[str]) -> List[str]:
+        """One LLM call for several user messages, returning a raw reply for each"""
+        count = len(messages)
+        sections = "\n\n".join(f"### Request {i}\n{message}" for i, message in enumerate(messages, 1))
+        raw = await self._request_completion(
+            f"Handle each of the {count} requests below independently.\n"
+            f'Respond with a JSON object {{"results": [...]}} holding exactly {count} '
+            f"responses in the format above, in request order.\n\n{sections}"
+        )
+        
+        try:
+            results = orjson.loads(raw).get("results")
+        except (orjson.JSONDecodeError, AttributeError):
+            results = None
+        if not isinstance(results, list) or len(results) != count:
+            logger.warning(f"Malformed reply for a batch of {count}, retrying individually")
+            return await asyncio.gather(*(self._request_completion(m) for m in messages))
+        
+        return [orjson.dumps(result).decode() for result in results]
+    
+    def _cache_key(self, user_prompt: str, context: Optional[Dict[str, Any]]) -> Tuple[str, str, str]:
+        """Cache key for translate"""
+        context_bytes = orjson.dumps(
+            context,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+            default=str
+        )
+        digest = hashlib.blake2b(context_bytes, digest_size=16).hexdigest()
+        return (self.model, user_prompt, digest)
     
     def _build_system_prompt(self) -> str:
         """Build comprehensive system prompt with FIBO expertise"""
@@ -179,17 +498,17 @@ Your role is to analyze user requests and translate them into optimal FIBO param
 
 FIBO Parameters Available:
 
-1. CAMERA ANGLE: {json.dumps(self.parameter_guide['camera_angle']['meanings'], indent=2)}
+1. CAMERA ANGLE: {_pretty_json(self.parameter_guide['camera_angle']['meanings'])}
 
-2. FIELD OF VIEW: {json.dumps(self.parameter_guide['fov']['meanings'], indent=2)}
+2. FIELD OF VIEW: {_pretty_json(self.parameter_guide['fov']['meanings'])}
 
-3. LIGHTING: {json.dumps(self.parameter_guide['lighting']['meanings'], indent=2)}
+3. LIGHTING: {_pretty_json(self.parameter_guide['lighting']['meanings'])}
 
-4. COLOR PALETTE: {json.dumps(self.parameter_guide['color_palette']['meanings'], indent=2)}
+4. COLOR PALETTE: {_pretty_json(self.parameter_guide['color_palette']['meanings'])}
 
-5. COMPOSITION: {json.dumps(self.parameter_guide['composition']['meanings'], indent=2)}
+5. COMPOSITION: {_pretty_json(self.parameter_guide['composition']['meanings'])}
 
-6. STYLE: {json.dumps(self.parameter_guide['style']['meanings'], indent=2)}
+6. STYLE: {_pretty_json(self.parameter_guide['style']['meanings'])}
 
 Your Response Format (JSON):
 {{
@@ -235,7 +554,7 @@ Guidelines:
         message = f"User Request: {user_prompt}"
         
         if context:
-            message += f"\n\nContext:\n{json.dumps(context, indent=2)}"
+            message += f"\n\nContext:\n{_pretty_json(context)}"
         
         message += "\n\nAnalyze this request and provide optimal FIBO parameters with detailed reasoning."
         
@@ -251,14 +570,16 @@ Guidelines:
                 validated[param] = value
                 continue
             
-            if param in self.parameter_guide:
-                allowed = self.parameter_guide[param]["options"]
-                if value in allowed:
-                    validated[param] = value
-                else:
-                    # Use first option as fallback
-                    validated[param] = allowed[0]
-                    logger.warning(f"Invalid {param}: {value}, using {allowed[0]}")
+            allowed = self._allowed.get(param)
+            if allowed is None:
+                continue
+            # Options are strings; anything else (including unhashable values) is invalid
+            if isinstance(value, str) and value in allowed:
+                validated[param] = value
+            else:
+                # Use first option as fallback
+                validated[param] = self._defaults[param]
+                logger.warning(f"Invalid {param}: {value}, using {self._defaults[param]}")
         
         return validated
     
@@ -267,17 +588,15 @@ Guidelines:
         try:
             reasoning = result.get("reasoning", {})
             
-            # More detailed reasoning = higher confidence
-            avg_length = sum(len(r) for r in reasoning.values()) / max(len(reasoning), 1)
-            
-            # Normalize to 0-1 range
-            confidence = min(avg_length / 100, 1.0)
+            # More detailed reasoning = higher confidence, normalized to 0-1
+            count = len(reasoning)
+            confidence = sum(map(len, reasoning.values())) / count / 100 if count else 0.0
             
             # Boost if suggestions provided
             if result.get("suggestions"):
-                confidence = min(confidence + 0.1, 1.0)
+                confidence += 0.1
             
-            return round(confidence, 2)
+            return round(min(confidence, 1.0), 2)
             
         except:
             return 0.7
@@ -285,31 +604,8 @@ Guidelines:
     def _get_fallback_response(self, user_prompt: str) -> Dict[str, Any]:
         """Provide safe fallback when AI translation fails"""
         return {
-            "intent": "General image generation",
-            "mood": "Balanced and professional",
-            "parameters": {
-                "camera_angle": "eye-level",
-                "fov": "standard",
-                "lighting": "natural",
-                "color_palette": "vibrant",
-                "composition": "rule-of-thirds",
-                "style": "photorealistic",
-                "prompt": user_prompt
-            },
-            "reasoning": {
-                "camera_angle": "Eye-level provides neutral perspective",
-                "fov": "Standard FOV mimics natural vision",
-                "lighting": "Natural lighting for realistic results",
-                "color_palette": "Vibrant colors for visual appeal",
-                "composition": "Rule of thirds is professionally balanced",
-                "style": "Photorealistic for versatility"
-            },
-            "confidence": 0.5,
-            "suggestions": [
-                "Try low-angle for more dramatic effect",
-                "Consider dramatic lighting for moodier atmosphere"
-            ],
-            "fallback": True
+            **_FALLBACK_TEMPLATE,
+            "parameters": {**_FALLBACK_PARAMETERS, "prompt": user_prompt}
         }
 
 
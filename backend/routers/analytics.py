@@ -4,21 +4,29 @@ Compare variants, track metrics, and get optimization insights.
 """
 
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from fastapi.responses import Response
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List, Dict, Any, Tuple
+import io
 import logging
 import sys
+import time
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from analytics import analytics_manager
+# Imported as a module: the manager is built lazily on first attribute access
+import analytics
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Seconds an assembled dashboard summary is reused across UI polls
+DASHBOARD_TTL = 5.0
+_dashboard_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+
 
 class CreateTestRequest(BaseModel):
     """Request model for creating an A/B test."""
@@ -28,16 +36,15 @@ class CreateTestRequest(BaseModel):
     variant_b: Dict[str, Any] = Field(..., description="Second variant parameters")
     metadata: Optional[Dict[str, Any]] = Field(default=None, description="Additional metadata")
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "test_id": "lighting_test_001",
-                "name": "Soft vs Hard Lighting",
-                "variant_a": {"lighting": "soft", "camera_angle": "eye_level"},
-                "variant_b": {"lighting": "hard", "camera_angle": "eye_level"},
-                "metadata": {"purpose": "Product photography optimization"}
-            }
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "test_id": "lighting_test_001",
+            "name": "Soft vs Hard Lighting",
+            "variant_a": {"lighting": "soft", "camera_angle": "eye_level"},
+            "variant_b": {"lighting": "hard", "camera_angle": "eye_level"},
+            "metadata": {"purpose": "Product photography optimization"}
         }
+    })
 
 
 class AddResultRequest(BaseModel):
@@ -70,7 +77,7 @@ async def create_test(request: CreateTestRequest):
     - Created test with unique ID
     """
     try:
-        test = analytics_manager.create_test(
+        test = analytics.analytics_manager.create_test(
             test_id=request.test_id,
             name=request.name,
             variant_a=request.variant_a,
@@ -80,7 +87,7 @@ async def create_test(request: CreateTestRequest):
         
         return {
             "success": True,
-            "test": test.to_dict(),
+            "test": test.to_dict(include_winner=True),
             "message": f"A/B test '{request.name}' created successfully"
         }
     except Exception as e:
@@ -97,8 +104,8 @@ async def list_tests():
     - List of tests with result counts and winners
     """
     return {
-        "tests": analytics_manager.list_tests(),
-        "total": len(analytics_manager.tests)
+        "tests": analytics.analytics_manager.list_tests(include_winner=True),
+        "total": len(analytics.analytics_manager.tests)
     }
 
 
@@ -108,15 +115,18 @@ async def get_test(test_id: str):
     Get detailed results for a specific A/B test.
     
     **Returns:**
-    - Complete test data including all results and winner
+    - Test data including the most recent results and winner
     """
-    test = analytics_manager.get_test(test_id)
+    test = analytics.analytics_manager.get_test(test_id)
     if not test:
         raise HTTPException(status_code=404, detail=f"Test not found: {test_id}")
     
-    return {
-        "test": test.to_dict()
-    }
+    # Results are streamed straight into the response body
+    body = io.BytesIO()
+    body.write(b'{"test":')
+    test.write_json(body, include_winner=True)
+    body.write(b'}')
+    return Response(content=body.getvalue(), media_type="application/json")
 
 
 @router.post("/tests/{test_id}/results")
@@ -128,14 +138,14 @@ async def add_test_result(test_id: str, request: AddResultRequest):
     - Updated test statistics
     """
     try:
-        analytics_manager.add_test_result(
+        analytics.analytics_manager.add_test_result(
             test_id=test_id,
             variant=request.variant,
             score=request.score,
             feedback=request.feedback
         )
         
-        test = analytics_manager.get_test(test_id)
+        test = analytics.analytics_manager.get_test(test_id)
         return {
             "success": True,
             "winner": test.get_winner(),
@@ -162,7 +172,7 @@ async def record_metric(request: RecordMetricRequest):
     - Confirmation of metric recorded
     """
     try:
-        analytics_manager.record_metric(
+        analytics.analytics_manager.record_metric(
             metric_name=request.metric_name,
             value=request.value,
             parameters=request.parameters,
@@ -198,7 +208,7 @@ async def get_parameter_performance(
     - Ranking by average score
     """
     try:
-        analysis = analytics_manager.get_parameter_performance(
+        analysis = analytics.analytics_manager.get_parameter_performance(
             parameter_name=parameter_name,
             metric_name=metric_name,
             days=days
@@ -230,7 +240,7 @@ async def get_optimization_recommendations(
     - Confidence levels based on sample size
     """
     try:
-        recommendations = analytics_manager.get_optimization_recommendations(
+        recommendations = analytics.analytics_manager.get_optimization_recommendations(
             current_parameters=parameters,
             metric_name=metric_name
         )
@@ -262,7 +272,7 @@ async def get_quality_trends(days: int = 30):
     - Min/max scores per day
     """
     try:
-        trends = analytics_manager.get_quality_trends(days=days)
+        trends = analytics.analytics_manager.get_quality_trends(days=days)
         return trends
     except Exception as e:
         logger.error(f"Trends analysis failed: {str(e)}")
@@ -280,35 +290,42 @@ async def get_dashboard_summary():
     - Top performing parameters
     - Quality trends
     """
+    global _dashboard_cache
+    now = time.monotonic()
+    if _dashboard_cache is not None and _dashboard_cache[0] > now:
+        return _dashboard_cache[1]
+    
     try:
         # Get recent trends
-        trends = analytics_manager.get_quality_trends(days=7)
+        trends = analytics.analytics_manager.get_quality_trends(days=7)
         
         # Get test summaries
-        tests = analytics_manager.list_tests()
+        tests = analytics.analytics_manager.list_tests()
         active_tests = [t for t in tests if t['results_count_a'] + t['results_count_b'] < 50]
         
         # Get top performers for key parameters
         top_performers = {}
         for param in ['lighting', 'composition', 'style']:
             try:
-                perf = analytics_manager.get_parameter_performance(param, days=30)
+                perf = analytics.analytics_manager.get_parameter_performance(param, days=30)
                 if perf['ranking']:
                     top_performers[param] = perf['ranking'][0]
             except:
                 pass
         
-        return {
+        summary = {
             "summary": {
                 "total_tests": len(tests),
                 "active_tests": len(active_tests),
-                "total_metrics": len(analytics_manager.metrics_history),
+                "total_metrics": analytics.analytics_manager.metrics_count,
                 "avg_quality_7d": trends.get('overall_avg', 0)
             },
             "active_tests": active_tests[:5],  # Top 5
             "top_performers": top_performers,
             "trends": trends
         }
+        _dashboard_cache = (now + DASHBOARD_TTL, summary)
+        return summary
     except Exception as e:
         logger.error(f"Dashboard summary failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -3,17 +3,20 @@ API router for Brand Guidelines system.
 Create, manage, and enforce brand identity across image generations.
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, HTTPException, UploadFile, File, Header
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 import logging
+import orjson
 import sys
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from brand_guidelines import brand_manager
+# Imported as a module: the manager is built lazily on first attribute access
+import brand_guidelines
+from http_caching import etag, static_json_response
 
 logger = logging.getLogger(__name__)
 
@@ -30,21 +33,20 @@ class CreateGuidelineRequest(BaseModel):
     rules: Optional[Dict[str, Any]] = Field(default=None, description="Custom brand rules")
     metadata: Optional[Dict[str, Any]] = Field(default=None, description="Additional metadata")
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "brand_id": "acme_corp",
-                "name": "ACME Corporation",
-                "colors": ["#FF6B35", "#004E89", "#F7F7F7"],
-                "fonts": ["Montserrat", "Open Sans"],
-                "styles": ["minimalist", "realistic"],
-                "rules": {
-                    "allowed_color_palettes": ["neutral", "muted"],
-                    "lighting": {"forbidden": ["hard"]},
-                    "composition": {"required": "rule_of_thirds"}
-                }
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "brand_id": "acme_corp",
+            "name": "ACME Corporation",
+            "colors": ["#FF6B35", "#004E89", "#F7F7F7"],
+            "fonts": ["Montserrat", "Open Sans"],
+            "styles": ["minimalist", "realistic"],
+            "rules": {
+                "allowed_color_palettes": ["neutral", "muted"],
+                "lighting": {"forbidden": ["hard"]},
+                "composition": {"required": "rule_of_thirds"}
             }
         }
+    })
 
 
 class UpdateGuidelineRequest(BaseModel):
@@ -79,7 +81,7 @@ async def create_guideline(request: CreateGuidelineRequest):
     - Created brand guideline with unique ID
     """
     try:
-        guideline = brand_manager.create_guideline(
+        guideline = brand_guidelines.brand_manager.create_guideline(
             brand_id=request.brand_id,
             name=request.name,
             colors=request.colors,
@@ -108,8 +110,8 @@ async def list_guidelines():
     - List of all brand guidelines with summary information
     """
     return {
-        "guidelines": brand_manager.list_guidelines(),
-        "total": len(brand_manager.guidelines)
+        "guidelines": brand_guidelines.brand_manager.list_guidelines(),
+        "total": len(brand_guidelines.brand_manager.guidelines)
     }
 
 
@@ -121,7 +123,7 @@ async def get_guideline(brand_id: str):
     **Returns:**
     - Complete brand guideline details
     """
-    guideline = brand_manager.get_guideline(brand_id)
+    guideline = brand_guidelines.brand_manager.get_guideline(brand_id)
     if not guideline:
         raise HTTPException(status_code=404, detail=f"Brand guideline not found: {brand_id}")
     
@@ -139,7 +141,7 @@ async def update_guideline(brand_id: str, request: UpdateGuidelineRequest):
     - Updated brand guideline
     """
     updates = request.model_dump(exclude_unset=True)
-    guideline = brand_manager.update_guideline(brand_id, **updates)
+    guideline = brand_guidelines.brand_manager.update_guideline(brand_id, **updates)
     
     if not guideline:
         raise HTTPException(status_code=404, detail=f"Brand guideline not found: {brand_id}")
@@ -159,7 +161,7 @@ async def delete_guideline(brand_id: str):
     **Returns:**
     - Success confirmation
     """
-    success = brand_manager.delete_guideline(brand_id)
+    success = brand_guidelines.brand_manager.delete_guideline(brand_id)
     if not success:
         raise HTTPException(status_code=404, detail=f"Brand guideline not found: {brand_id}")
     
@@ -187,7 +189,7 @@ async def validate_generation(request: ValidateGenerationRequest):
     - Pass/fail status
     """
     try:
-        result = brand_manager.validate_generation(
+        result = brand_guidelines.brand_manager.validate_generation(
             brand_id=request.brand_id,
             parameters=request.parameters,
             image_analysis=request.image_analysis
@@ -215,7 +217,7 @@ async def parse_document(file: UploadFile = File(..., description="Brand guideli
         content = await file.read()
         text = content.decode('utf-8')
         
-        parsed = brand_manager.parse_document(text)
+        parsed = brand_guidelines.brand_manager.parse_document(text)
         
         return {
             "success": True,
@@ -230,46 +232,51 @@ async def parse_document(file: UploadFile = File(..., description="Brand guideli
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Constant payload, serialized once at import
+_EXAMPLES_JSON = orjson.dumps({
+    "examples": [
+        {
+            "name": "Tech Startup",
+            "brand_id": "tech_startup_example",
+            "colors": ["#00D9FF", "#0A0E27", "#F8F9FA"],
+            "styles": ["minimalist", "realistic"],
+            "rules": {
+                "allowed_color_palettes": ["vibrant", "neutral"],
+                "composition": {"required": "rule_of_thirds"}
+            }
+        },
+        {
+            "name": "Luxury Fashion",
+            "brand_id": "luxury_fashion_example",
+            "colors": ["#000000", "#FFFFFF", "#C9B037"],
+            "styles": ["cinematic", "artistic"],
+            "rules": {
+                "allowed_color_palettes": ["monochrome", "muted"],
+                "lighting": {"forbidden": ["hard"]},
+                "composition": {"required": "symmetrical"}
+            }
+        },
+        {
+            "name": "Eco-Friendly Brand",
+            "brand_id": "eco_brand_example",
+            "colors": ["#2D5016", "#88AB75", "#E8DDB5"],
+            "styles": ["realistic", "vintage"],
+            "rules": {
+                "allowed_color_palettes": ["neutral", "pastel"],
+                "lighting": {"preferred": ["soft", "golden_hour"]}
+            }
+        }
+    ]
+})
+_EXAMPLES_ETAG = etag(_EXAMPLES_JSON)
+
+
 @router.get("/examples")
-async def get_examples():
+async def get_examples(if_none_match: Optional[str] = Header(None)):
     """
     Get example brand guidelines for common use cases.
     
     **Returns:**
     - Example guidelines for different industries
     """
-    return {
-        "examples": [
-            {
-                "name": "Tech Startup",
-                "brand_id": "tech_startup_example",
-                "colors": ["#00D9FF", "#0A0E27", "#F8F9FA"],
-                "styles": ["minimalist", "realistic"],
-                "rules": {
-                    "allowed_color_palettes": ["vibrant", "neutral"],
-                    "composition": {"required": "rule_of_thirds"}
-                }
-            },
-            {
-                "name": "Luxury Fashion",
-                "brand_id": "luxury_fashion_example",
-                "colors": ["#000000", "#FFFFFF", "#C9B037"],
-                "styles": ["cinematic", "artistic"],
-                "rules": {
-                    "allowed_color_palettes": ["monochrome", "muted"],
-                    "lighting": {"forbidden": ["hard"]},
-                    "composition": {"required": "symmetrical"}
-                }
-            },
-            {
-                "name": "Eco-Friendly Brand",
-                "brand_id": "eco_brand_example",
-                "colors": ["#2D5016", "#88AB75", "#E8DDB5"],
-                "styles": ["realistic", "vintage"],
-                "rules": {
-                    "allowed_color_palettes": ["neutral", "pastel"],
-                    "lighting": {"preferred": ["soft", "golden_hour"]}
-                }
-            }
-        ]
-    }
+    return static_json_response(_EXAMPLES_JSON, _EXAMPLES_ETAG, if_none_match)
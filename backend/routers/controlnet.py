@@ -5,7 +5,7 @@ Advanced composition control with edge detection, depth maps, and pose estimatio
 
 from fastapi import APIRouter, HTTPException, UploadFile, File, Query
 from fastapi.responses import Response
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Literal, Optional, Dict, Any
 import logging
 import sys
@@ -38,22 +38,22 @@ class ProcessControlRequest(BaseModel):
         description="Edge detection sensitivity (for canny_edge)"
     )
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "control_type": "canny_edge",
-                "strength": 0.8,
-                "sensitivity": "medium"
-            }
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "control_type": "canny_edge",
+            "strength": 0.8,
+            "sensitivity": "medium"
         }
+    })
 
 
 @router.post("/process")
 async def process_control_image(
     file: UploadFile = File(..., description="Reference image to process"),
     control_type: str = Query(..., description="Control type"),
-    strength: float = Query(default=1.0, description="Control strength (0-1)"),
-    sensitivity: Optional[str] = Query(default='medium', description="Edge sensitivity")
+    strength: float = Query(default=1.0, ge=0.0, le=1.0, description="Control strength (0-1)"),
+    sensitivity: Optional[str] = Query(default='medium', description="Edge sensitivity"),
+    output_format: Literal['png', 'jpeg'] = Query(default='png', description="Output image format")
 ):
     """
     Process a reference image to create a ControlNet control image.
@@ -81,7 +81,7 @@ async def process_control_image(
     - Sketch-to-image workflows
     
     **Returns:**
-    - Processed control image (PNG format)
+    - Processed control image (PNG by default, or JPEG)
     - Metadata with processing details
     """
     try:
@@ -100,17 +100,19 @@ async def process_control_image(
             image_data=image_data,
             control_type=control_type,
             strength=strength,
+            output_format=output_format,
             sensitivity=sensitivity
         )
         
         # Generate filename
         original_name = file.filename.rsplit('.', 1)[0] if file.filename else 'control'
-        download_filename = f"{original_name}_{control_type}.png"
+        extension = 'jpg' if output_format == 'jpeg' else 'png'
+        download_filename = f"{original_name}_{control_type}.{extension}"
         
         # Return processed control image
         return Response(
             content=processed_data,
-            media_type='image/png',
+            media_type=f'image/{output_format}',
             headers={
                 'Content-Disposition': f'attachment; filename="{download_filename}"',
                 'X-Control-Metadata': str(metadata)
@@ -2,17 +2,21 @@
 Generation API Router
 Handles image generation requests
 """
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from pydantic import BaseModel, Field, validator
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Header
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 import logging
 import hashlib
 import json
 import asyncio
+import httpx
 
 from fibo_integration import fibo_integration
 from fibo_agent import fibo_agent
+from http_caching import etag_matches
+from mock_fibo import get_mock_image
 from database import get_db, Generation
 from sqlalchemy.orm import Session
 
@@ -95,43 +99,50 @@ class GenerationRequest(BaseModel):
     use_cache: bool = Field(default=True, description="Use cached results if available")
     max_retries: int = Field(default=3, description="Maximum retry attempts", ge=0, le=5)
     
-    @validator('mode')
+    @field_validator('mode')
+    @classmethod
     def validate_mode(cls, v):
         if v not in ['ai', 'manual']:
             raise ValueError('mode must be "ai" or "manual"')
         return v
     
-    @validator('camera_angle')
+    @field_validator('camera_angle')
+    @classmethod
     def validate_camera_angle(cls, v):
         if v and v not in ['eye-level', 'low-angle', 'high-angle', 'dutch-tilt', 'bird\'s-eye']:
             raise ValueError(f'Invalid camera_angle: {v}')
         return v
     
-    @validator('fov')
+    @field_validator('fov')
+    @classmethod
     def validate_fov(cls, v):
         if v and v not in ['wide', 'standard', 'telephoto']:
             raise ValueError(f'Invalid fov: {v}')
         return v
     
-    @validator('lighting')
+    @field_validator('lighting')
+    @classmethod
     def validate_lighting(cls, v):
         if v and v not in ['natural', 'studio', 'dramatic', 'golden-hour', 'soft', 'hard']:
             raise ValueError(f'Invalid lighting: {v}')
         return v
     
-    @validator('color_palette')
+    @field_validator('color_palette')
+    @classmethod
     def validate_color_palette(cls, v):
         if v and v not in ['vibrant', 'pastel', 'monochrome', 'warm', 'cool', 'neon']:
             raise ValueError(f'Invalid color_palette: {v}')
         return v
     
-    @validator('composition')
+    @field_validator('composition')
+    @classmethod
     def validate_composition(cls, v):
         if v and v not in ['rule-of-thirds', 'centered', 'dynamic', 'minimal']:
             raise ValueError(f'Invalid composition: {v}')
         return v
     
-    @validator('style')
+    @field_validator('style')
+    @classmethod
     def validate_style(cls, v):
         if v and v not in ['photorealistic', 'cinematic', 'editorial', 'commercial']:
             raise ValueError(f'Invalid style: {v}')
@@ -153,7 +164,7 @@ class GenerationResponse(BaseModel):
 
 class BatchGenerationRequest(BaseModel):
     """Request model for batch image generation"""
-    requests: List[GenerationRequest] = Field(..., description="List of generation requests", min_items=1, max_items=50)
+    requests: List[GenerationRequest] = Field(..., description="List of generation requests", min_length=1, max_length=50)
     parallel: bool = Field(default=True, description="Generate in parallel or sequential")
     continue_on_error: bool = Field(default=True, description="Continue processing if one generation fails")
 
@@ -167,6 +178,12 @@ class BatchGenerationResponse(BaseModel):
     errors: List[Optional[str]]
 
 
+class IntentRequest(BaseModel):
+    """Request model for creative intent analysis"""
+    prompt: str = Field(..., description="Description of desired image", min_length=3, max_length=2000)
+    context: Optional[Dict[str, Any]] = Field(None, description="Brand guidelines, project type, etc.")
+
+
 @router.post("/", response_model=GenerationResponse)
 async def generate_image(
     request: GenerationRequest,
@@ -251,7 +268,8 @@ async def generate_image(
                         lighting=params.get("lighting"),
                         color_palette=params.get("color_palette"),
                         composition=params.get("composition"),
-                        style=params.get("style")
+                        style=params.get("style"),
+                        cache_bypass=not request.use_cache
                     )
                     break  # Success!
                 except Exception as e:
@@ -280,7 +298,8 @@ async def generate_image(
                         lighting=request.lighting,
                         color_palette=request.color_palette,
                         composition=request.composition,
-                        style=request.style
+                        style=request.style,
+                        cache_bypass=not request.use_cache
                     )
                     break  # Success!
                 except Exception as e:
@@ -344,6 +363,112 @@ async def generate_image(
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
 
+@router.post("/stream")
+async def generate_image_stream(request: GenerationRequest):
+    """
+    Generate an image with explicit parameters, streaming the FIBO response body
+    
+    The upstream JSON is forwarded as it arrives instead of being buffered;
+    no generation record is stored.
+    """
+    stream = fibo_integration.generate_stream(
+        prompt=request.prompt,
+        camera_angle=request.camera_angle,
+        fov=request.fov,
+        lighting=request.lighting,
+        color_palette=request.color_palette,
+        composition=request.composition,
+        style=request.style
+    )
+    
+    # Wait for the first chunk so upstream errors still map to an HTTP status
+    try:
+        first_chunk = await stream.__anext__()
+    except StopAsyncIteration:
+        first_chunk = b""
+    except httpx.HTTPStatusError as e:
+        await stream.aclose()
+        raise HTTPException(status_code=502, detail=f"FIBO API error: {str(e)}")
+    except Exception as e:
+        await stream.aclose()
+        logger.error(f"Streaming generation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
+    
+    async def body():
+        yield first_chunk
+        async for chunk in stream:
+            yield chunk
+    
+    return StreamingResponse(body(), media_type="application/json")
+
+
+@router.post("/analyze/stream")
+async def analyze_intent_stream(request: IntentRequest):
+    """
+    Analyze creative intent, streaming the agent's JSON reply as it is generated
+    
+    The body is the same JSON analyze_intent returns, forwarded token by token
+    so clients can render it before the completion finishes.
+    """
+    stream = fibo_agent.analyze_intent_stream(request.prompt, request.context)
+    
+    # Wait for the first token so OpenAI errors still map to an HTTP status
+    try:
+        first_token = await stream.__anext__()
+    except StopAsyncIteration:
+        first_token = ""
+    except Exception as e:
+        await stream.aclose()
+        logger.error(f"Streaming intent analysis failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Intent analysis failed: {str(e)}")
+    
+    async def body():
+        yield first_token
+        async for token in stream:
+            yield token
+    
+    return StreamingResponse(body(), media_type="application/json")
+
+
+def _get_admission():
+    """Admission controller of the live FIBO integration (absent in mock mode)"""
+    admission = getattr(fibo_integration, "admission", None)
+    if admission is None:
+        raise HTTPException(status_code=404, detail="Admission control is not available in mock mode")
+    return admission
+
+
+@router.get("/admission")
+async def get_admission():
+    """
+    Get the FIBO concurrency limit, in-flight calls and observed 429 responses
+    """
+    admission = _get_admission()
+    return {
+        "limit": admission.limit,
+        "active": admission.active,
+        "rate_limited_count": fibo_integration.rate_limited_count
+    }
+
+
+@router.get("/mock-image/{digest}")
+async def serve_mock_image(digest: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Serve a placeholder image rendered by the mock FIBO integration
+    """
+    stored = await get_mock_image(digest)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Mock image not found")
+    
+    # Content-addressed, so the hash is a strong ETag and the bytes never change
+    headers = {"ETag": f'"{digest}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    image_bytes, mime_type = stored
+    return Response(content=image_bytes, media_type=mime_type, headers=headers)
+
+
 @router.get("/parameters")
 async def get_parameters():
     """
@@ -5,7 +5,7 @@ Handles HDR tone mapping, color space conversion, and format export.
 
 from fastapi import APIRouter, HTTPException, UploadFile, File, Query
 from fastapi.responses import Response
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Literal, Dict, Any
 import logging
 import sys
@@ -46,16 +46,15 @@ class ProcessImageRequest(BaseModel):
         description="Quick preset (overrides other settings): web, print, film_tv, cinema, games"
     )
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "output_format": "tiff",
-                "bit_depth": 16,
-                "color_space": "adobe_rgb",
-                "tone_mapping": "aces",
-                "preset": None
-            }
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "output_format": "tiff",
+            "bit_depth": 16,
+            "color_space": "adobe_rgb",
+            "tone_mapping": "aces",
+            "preset": None
         }
+    })
 
 
 class ProcessImageResponse(BaseModel):
@@ -101,8 +100,8 @@ async def process_image(
         image_data = await file.read()
         
         # Process image
-        processed_data, metadata = image_processor.process_image(
-            image_data=image_data,
+        processed_data, metadata = await image_processor.process_image_async(
+            image_data,
             output_format=output_format,
             bit_depth=bit_depth,
             color_space=color_space,
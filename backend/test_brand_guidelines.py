@@ -0,0 +1,42 @@
+"""
+Tests for brand guideline validation
+Run with: pytest test_brand_guidelines.py
+"""
+import pytest
+
+from brand_guidelines import BrandGuidelineManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = BrandGuidelineManager(storage_path=str(tmp_path))
+    manager.create_guideline(
+        brand_id="acme",
+        name="ACME",
+        colors=["#000000"],
+        styles=["minimalist", "realistic"],
+        rules={
+            "allowed_color_palettes": ["neutral", "muted"],
+            "lighting": {"forbidden": ["hard"]}
+        }
+    )
+    return manager
+
+
+def test_compliant_parameters(manager):
+    result = manager.validate_generation(
+        "acme", {"style": "minimalist", "color_palette": "neutral", "lighting": "soft"}
+    )
+    assert result["compliance_score"] == 100
+    assert result["violations"] == []
+
+
+@pytest.mark.parametrize("parameters, expected_score", [
+    ({"style": ["minimalist"], "color_palette": "neutral", "lighting": "soft"}, 80),
+    ({"style": "minimalist", "color_palette": {"name": "neutral"}, "lighting": "soft"}, 85),
+    ({"style": "minimalist", "color_palette": "neutral", "lighting": ["hard"]}, 100),
+])
+def test_list_and_dict_values_do_not_raise(manager, parameters, expected_score):
+    # Unhashable values are never allowed and never forbidden
+    result = manager.validate_generation("acme", parameters)
+    assert result["compliance_score"] == expected_score
@@ -0,0 +1,33 @@
+"""
+Tests for the If-None-Match handling in http_caching
+Run with: pytest test_http_caching.py
+"""
+import pytest
+
+from http_caching import etag, etag_matches, static_json_response
+
+BODY = b'{"examples": []}'
+TAG = etag(BODY)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    (TAG, True),
+    (f"W/{TAG}", True),
+    (f'"other", {TAG}', True),
+    (f'"other",W/{TAG}', True),
+    ("*", True),
+    ('"other"', False),
+    (TAG.strip('"'), False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, TAG) is expected
+
+
+def test_static_json_response():
+    assert static_json_response(BODY, TAG, f'W/{TAG}').status_code == 304
+    response = static_json_response(BODY, TAG, '"other"')
+    assert response.status_code == 200
+    assert response.body == BODY
+    assert response.headers["ETag"] == TAG